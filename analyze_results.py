@@ -7,8 +7,13 @@ Since:  2020-2021
 """
 
 import pandas
+from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
 from check_single_instance import debug_instance
+from columnar_results import is_columnar, read_results, result_columns
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")   # the figures are only saved to files, so no interactive backend is needed.
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 
@@ -20,121 +25,133 @@ logger.addHandler(logging.StreamHandler(sys.stdout))
 logger.setLevel(logging.INFO)
 
 
-def print_results_by_numagents_and_status(results_csv_file:str, status_column_name:str, output_file:str):
+def results_dtypes(columns:list)->dict:
     """
-    Find the number and percentage of instances that completed correctly (without timeout or error)
+    Compact dtypes for the columns of a results file.
+
+    >>> results_dtypes(["instance_id", "num_agents", "prop_status", "prop_time_in_seconds", "prop_num_sharing", "prop_product"])
+    {'instance_id': 'int32', 'num_agents': 'int16', 'prop_status': 'category', 'prop_time_in_seconds': 'float32', 'prop_num_sharing': 'Int8', 'prop_product': 'float64'}
+    """
+    dtypes = {}
+    for column in columns:
+        if column=="instance_id":
+            dtypes[column] = "int32"
+        elif column in ["num_agents", "num_resources"]:
+            dtypes[column] = "int16"
+        elif column.endswith("_status"):
+            dtypes[column] = "category"
+        elif column.endswith("_num_sharing"):
+            dtypes[column] = "Int8"       # nullable, since solvers that were not run leave the column empty.
+        elif column.endswith("_in_seconds"):
+            dtypes[column] = "float32"
+        else:
+            dtypes[column] = "float64"
+    return dtypes
+
+
+class AnalysisSession:
+    """
+    The results of an experiment, loaded once with compact dtypes, with the common row masks precomputed.
+    All print_*, plot_* and compare_* functions accept a session, so the results file is parsed only once per analysis.
+    """
+    def __init__(self, results_file:str, columns:List[str]=None, first_row:int=0):
+        """
+        :param results_file: a CSV file, or a columnar results folder (see columnar_results.py).
+        :param columns: if given, only these columns are read (plus prop_status, which marks the duplicate rows).
+        :param first_row: if given, the rows before it are skipped (used for reading only the rows added since a previous analysis).
+        """
+        self.results_file = results_file
+        if columns is not None and "prop_status" not in columns:
+            columns = [*columns, "prop_status"]
+        if is_columnar(results_file):
+            results = read_results(results_file, columns=columns).iloc[first_row:].reset_index(drop=True)
+            results = results.astype(results_dtypes(results.columns))
+        else:
+            dtypes = results_dtypes(columns if columns is not None else result_columns(results_file))
+            results = pandas.read_csv(results_file, usecols=columns, dtype=dtypes, skiprows=range(1, first_row+1))
+        self.set_results(results)
+
+    def set_results(self, results:pandas.DataFrame):
+        self.results = results
+        status_columns = [column for column in self.results.columns if column.endswith("_status")]
+        self.ok = {column: self.results[column]=="OK" for column in status_columns}
+        self.timeout = {column: self.results[column]=="TimeOut" for column in status_columns}
+        self.duplicate = self.results["prop_status"].astype(str).str.startswith("Duplicate")   # "Duplicate" or "Duplicate-of:<id>"
+
+    def ok_or_timeout(self, status_column_name:str)->pandas.Series:
+        return self.ok[status_column_name] | self.timeout[status_column_name]
+
+
+def status_counts(session:AnalysisSession, keys:List[str], status_column_names:List[str])->pandas.DataFrame:
+    """
+    Count the statuses of all given status columns in a single groupby over the (non-duplicate) rows.
+    :return a DataFrame indexed by the keys, with a column "num_rows" and a column "<status column>=<status>" for each status.
+            Counts of disjoint sets of rows can be added together.
     """
-    results = pandas.read_csv(results_csv_file)
-    results = results.query("prop_status!='Duplicate'")
-    results_by_num_agents_and_prop_status = results.groupby(["num_agents",status_column_name]).agg({"instance_id":"count"}).rename(columns={"instance_id":"count"})
-    results_by_num_agents  = results.groupby(["num_agents"]).agg({"instance_id":"count"}).rename(columns={"instance_id":"count"})
-    results_by_num_agents_and_prop_status["percent"] = np.round(results_by_num_agents_and_prop_status.div(results_by_num_agents, level="num_agents")*100)
-    results = results_by_num_agents_and_prop_status.reset_index()
+    results = session.results.loc[~session.duplicate]
+    indicators = pandas.get_dummies(results[status_column_names].astype(object), prefix_sep="=", dtype=int)
+    indicators.insert(0, "num_rows", 1)
+    return indicators.groupby([results[key] for key in keys]).sum()
 
-    csv_output = ""
 
-    # Add a row per num-agents:
-    for num_agents in sorted(results.num_agents.unique()):
-        results_numagents = results.loc[results.num_agents==num_agents]
-        try:
-            total_count = results_numagents["count"].sum()
-            total_percent = results_numagents["percent"].sum()
-            ok_count = results_numagents.loc[results[status_column_name]=="OK"]["count"].sum()
-            ok_percent = results_numagents.loc[results[status_column_name]=="OK"]["percent"].sum()
-        except IndexError:
-            ok_count = ok_percent = 0
-        csv_output += "{},{},{},{},{}".format(num_agents,total_count,total_percent,ok_count,ok_percent) + "\n"
-
-    # Add the total row:
-    total_count = results["count"].sum()
-    total_percent = 100.0
-    ok_count = results.loc[results[status_column_name] == "OK"]["count"].sum()
-    ok_percent = np.round(ok_count*100/ total_count,1)
-    csv_output += "{},{},{},{},{}".format("Total", total_count, total_percent, ok_count, ok_percent) + "\n"
-
-    csv_output = "num_agents,total_count,total_percent,ok_count,ok_percent\n" + csv_output
-    print(csv_output)
-    with open(output_file, 'w') as f: f.write(csv_output)
-
-
-def print_results_by_numresources_and_status(results_csv_file:str, status_column_name:str, output_file:str):
+def tables_from_status_counts(counts:pandas.DataFrame, keys:List[str], status_column_names:List[str])->Dict[str,pandas.DataFrame]:
     """
-    Find the number and percentage of instances that completed correctly (without timeout or error)
+    :return a dict mapping each status column to a table with the columns: *keys, total_count, total_percent, ok_count, ok_percent;
+            the last row is the total.
     """
-    results = pandas.read_csv(results_csv_file)
-    results = results.query("prop_status!='Duplicate'")
-    results_by_num_resources_and_prop_status = results.groupby(["num_resources",status_column_name]).agg({"instance_id":"count"}).rename(columns={"instance_id":"count"})
-    results_by_num_resources  = results.groupby(["num_resources"]).agg({"instance_id":"count"}).rename(columns={"instance_id":"count"})
-    results_by_num_resources_and_prop_status["percent"] = np.round(results_by_num_resources_and_prop_status.div(results_by_num_resources, level="num_resources")*100)
-    results = results_by_num_resources_and_prop_status.reset_index()
-
-    csv_output = ""
-
-    # Add a row per num-resources:
-    for num_resources in sorted(results.num_resources.unique()):
-        results_numresources = results.loc[results.num_resources==num_resources]
-        try:
-            total_count = results_numresources["count"].sum()
-            total_percent = results_numresources["percent"].sum()
-            ok_count = results_numresources.loc[results[status_column_name]=="OK"]["count"].sum()
-            ok_percent = results_numresources.loc[results[status_column_name]=="OK"]["percent"].sum()
-        except IndexError:
-            ok_count = ok_percent = 0
-        csv_output += "{},{},{},{},{}".format(num_resources,total_count,total_percent,ok_count,ok_percent) + "\n"
-
-    # Add the total row:
-    total_count = results["count"].sum()
-    total_percent = 100.0
-    ok_count = results.loc[results[status_column_name] == "OK"]["count"].sum()
-    ok_percent = np.round(ok_count*100/ total_count,1)
-    csv_output += "{},{},{},{},{}".format("Total", total_count, total_percent, ok_count, ok_percent) + "\n"
-
-    csv_output = "num_resources,total_count,total_percent,ok_count,ok_percent\n" + csv_output
-    print(csv_output)
-    with open(output_file, 'w') as f: f.write(csv_output)
-
-
-def print_results_by_numagentsresources_and_status(results_csv_file:str, status_column_name:str, output_file:str):
+    tables = {}
+    for status_column_name in status_column_names:
+        status_counts = counts.loc[:, counts.columns.str.startswith(status_column_name+"=")]
+        ok_column = status_column_name+"=OK"
+        ok_counts = status_counts[ok_column] if ok_column in status_counts.columns else pandas.Series(0, index=status_counts.index)
+        percents = np.round(status_counts.div(counts["num_rows"], axis=0)*100)
+        ok_percents = percents[ok_column] if ok_column in percents.columns else pandas.Series(0.0, index=percents.index)
+        table = pandas.DataFrame({
+            "total_count": status_counts.sum(axis=1),
+            "total_percent": percents.sum(axis=1).astype(float),
+            "ok_count": ok_counts,
+            "ok_percent": ok_percents,
+        })
+        table = table.loc[table["total_count"]>0].reset_index()
+        total_count = table["total_count"].sum()
+        ok_count = table["ok_count"].sum()
+        total_row = {**{key:"Total" for key in keys}, "total_count": total_count, "total_percent": 100.0, "ok_count": ok_count, "ok_percent": np.round(ok_count*100/total_count,1)}
+        tables[status_column_name] = pandas.concat([table.astype({key:object for key in keys}), pandas.DataFrame([total_row])], ignore_index=True)
+    return tables
+
+
+def status_tables(session:AnalysisSession, keys:List[str], status_column_names:List[str])->Dict[str,pandas.DataFrame]:
     """
-    Find the number and percentage of instances that completed correctly (without timeout or error)
+    Find the number and percentage of instances that completed correctly (without timeout or error),
+    for each combination of the given keys (e.g. ["num_agents"] or ["num_agents","num_resources"]), and for each of the given status columns.
+    All status columns are counted in a single groupby over the data (see `tables_from_status_counts` for the table format).
     """
-    results = pandas.read_csv(results_csv_file)
-    results = results.query("prop_status!='Duplicate'")
-    results_by_nums_and_prop_status = results.groupby(["num_agents","num_resources",status_column_name]).agg({"instance_id":"count"}).rename(columns={"instance_id":"count"})
-    results = results_by_nums_and_prop_status.reset_index()
+    return tables_from_status_counts(status_counts(session, keys, status_column_names), keys, status_column_names)
 
-    csv_output = ""
 
-    # Add a row per num-resources:
-    for num_agents in sorted(results.num_agents.unique()):
-        for num_resources in sorted(results.num_resources.unique()):
-            results_nums = results.loc[(results.num_resources==num_resources) & (results.num_agents==num_agents)]
-            try:
-                total_count = results_nums["count"].sum()
-                ok_count = results_nums.loc[results[status_column_name]=="OK"]["count"].sum()
-            except IndexError:
-                ok_count = 0
-            if total_count > 0:
-                csv_output += "{},{},{},{}".format(num_agents,num_resources,total_count,ok_count) + "\n"
+def write_status_tables(tables:Dict[str,pandas.DataFrame], output_files:Dict[str,str]):
+    for status_column_name, table in tables.items():
+        csv_output = table.to_csv(index=False)
+        print(csv_output)
+        with open(output_files[status_column_name], 'w') as f: f.write(csv_output)
 
-    # Add the total row:
-    total_count = results["count"].sum()
-    ok_count = results.loc[results[status_column_name] == "OK"]["count"].sum()
-    csv_output += "{},{},{},{}".format("Total", "Total", total_count, ok_count) + "\n"
 
-    csv_output = "num_agents,num_resources,total_count,ok_count\n" + csv_output
-    print(csv_output)
-    with open(output_file, 'w') as f: f.write(csv_output)
+def print_status_tables(session:AnalysisSession, keys:List[str], output_files:Dict[str,str]):
+    """
+    Compute the status tables (see `status_tables`) and write each of them to a CSV file.
+    :param output_files: maps each status column name to the path of its output file.
+    """
+    write_status_tables(status_tables(session, keys, list(output_files)), output_files)
 
 
 
 
 
-def print_buggy_instances(results_csv_file:str):
+def print_buggy_instances(session:AnalysisSession):
     """
     Find instances in which the number of sharings is more than n-1.
     """
-    results = pandas.read_csv(results_csv_file)
+    results = session.results
     ef_bugs = results.loc[results.ef_status=="Bug"]
     if len(ef_bugs)>0:
         print("EF bugs:", ef_bugs)
@@ -147,20 +164,19 @@ facecolor='w'
 edgecolor='k'
 
 
-def plot_results_by_agents_and_resources(results_csv_file:str, figure_title:str, status_column_name:str, sharings_column_name:str, output_file:str):
-    results = pandas.read_csv(results_csv_file)
-    results = results.loc[results[status_column_name]=="OK"]
+def plot_results_by_agents_and_resources(session:AnalysisSession, figure_title:str, status_column_name:str, sharings_column_name:str, output_file:str):
+    results = session.results.loc[session.ok[status_column_name]]
     nums_agents = [2,3,4,5]
     nums_resources = [3,4,5]
 
-    fig = plt.figure(figsize=figsize, dpi=dpi, facecolor=facecolor, edgecolor=edgecolor)
-    fig.suptitle(figure_title)
+    figure = plt.figure(figsize=figsize, dpi=dpi, facecolor=facecolor, edgecolor=edgecolor)
+    figure.suptitle(figure_title)
     axis = None
     for num_agents in nums_agents:
         results_numagents = results.loc[results.num_agents==num_agents]
         results_numagents_numresources = results_numagents.groupby("num_resources").agg({"instance_id":"count"})
         print(results_numagents_numresources)
-        axis = plt.subplot(len(nums_agents),1,num_agents-nums_agents[0]+1)
+        axis = figure.add_subplot(len(nums_agents),1,num_agents-nums_agents[0]+1)
         axis.set_title("{} agents".format(num_agents))
         previous_counts = np.zeros(len(nums_resources))
         for num_sharing in range(num_agents):
@@ -180,7 +196,8 @@ def plot_results_by_agents_and_resources(results_csv_file:str, figure_title:str,
             previous_counts += map_num_resources_to_instance_count
     axis.set_xlabel("#resources")
     axis.set_xticks(nums_resources)
-    plt.savefig(output_file)
+    figure.savefig(output_file)
+    plt.close(figure)
 
 
 def num_sharing_to_grayscale(num_sharing:int)->float:
@@ -191,21 +208,20 @@ def num_sharing_to_grayscale(num_sharing:int)->float:
     intensity = 0.7**num_sharing
     return (intensity,intensity,intensity)
 
-def plot_results_by_agents(results_csv_file:str, figure_title:str, column_name:str, output_file:str):
+def plot_results_by_agents(session:AnalysisSession, figure_title:str, column_name:str, output_file:str):
     status_column_name =   column_name+"_status"
     time_column_name =     column_name+"_time_in_seconds"
     sharings_column_name = column_name+"_num_sharing"
 
     max_num_resources = 999
 
-    results = pandas.read_csv(results_csv_file)
-    results = results.loc[(results[status_column_name]=="OK") | (results[status_column_name]=="TimeOut")]
+    results = session.results.loc[session.ok_or_timeout(status_column_name)]
     results = results.loc[results.num_resources <= max_num_resources]
 
     nums_agents = [[2], [3], [4], [5,6], [7,8]]
 
     map_numagents_to_heights = {}
-    _, axis = plt.subplots(1,1)
+    figure, axis = plt.subplots(1,1)
     axis.set_title(figure_title, fontsize=15)
     xticks = []
     xtick_labels = []
@@ -215,14 +231,14 @@ def plot_results_by_agents(results_csv_file:str, figure_title:str, column_name:s
         colors = [num_sharing_to_grayscale(num_sharing) for num_sharing in range(max_num_sharings+1)]
         heights = np.zeros(max_num_sharings+1)
         results_with_numagents = results.loc[results.num_agents.isin(num_agents)]
-        ok_results_with_numagents = results_with_numagents.loc[results_with_numagents[status_column_name]=="OK"]
+        ok_results_with_numagents = results_with_numagents.loc[session.ok[status_column_name]]
         num_instances_with_numagents =  len(results_with_numagents)
         if num_instances_with_numagents==0:
             print(f"No instances with {num_agents} agents.")
             continue
         num_ok_instances_with_numagents = len(ok_results_with_numagents)
         for num_sharing in range(max_num_sharings+1):
-            num_instances_with_numsharing = sum(results_with_numagents[sharings_column_name]==num_sharing)
+            num_instances_with_numsharing = (results_with_numagents[sharings_column_name]==num_sharing).sum()
             if num_instances_with_numsharing>0:
                 max_num_sharing_in_data=num_sharing
             heights[num_sharing] = 100 * num_instances_with_numsharing / num_instances_with_numagents
@@ -236,14 +252,14 @@ def plot_results_by_agents(results_csv_file:str, figure_title:str, column_name:s
     axis.tick_params(axis='x', which='major', labelsize=12)
     axis.tick_params(axis='y', which='major', labelsize=15)
 
-    fig = plt.gcf()
-    fig.set_size_inches(len(nums_agents)*2+3, 7)
-    plt.savefig(output_file+".pdf", format="pdf")
+    figure.set_size_inches(len(nums_agents)*2+3, 7)
+    figure.savefig(output_file+".pdf", format="pdf")
+    plt.close(figure)
 
 
 STYLES=["r*-","go-","b.-","y.-","k.-","c.-"]
 
-def plot_time_by_resources(results_csv_file:str, figure_title:str, column_name:str, output_file:str):
+def plot_time_by_resources(session:AnalysisSession, figure_title:str, column_name:str, output_file:str):
     status_column_name =   column_name+"_status"
     time_column_name =     column_name+"_time_in_seconds"
     sharings_column_name = column_name+"_num_sharing"
@@ -252,60 +268,66 @@ def plot_time_by_resources(results_csv_file:str, figure_title:str, column_name:s
     max_num_resources = 999
     max_num_sharings = 999
 
-    results = pandas.read_csv(results_csv_file)
-    results = results.loc[(results[status_column_name]=="OK") | (results[status_column_name]=="TimeOut")]
+    results = session.results.loc[session.ok_or_timeout(status_column_name)]
     # results = results.loc[results[time_column_name]>=0]
     results = results.loc[results["num_resources"] <= max_num_resources]
     results = results.loc[results[sharings_column_name] <= max_num_sharings]
     results = results.loc[results[sharings_column_name] >= 0]
 
-    _, axis = plt.subplots(1,1)
-    axis.set_title(figure_title)
-
     # group_by_column_name = "num_resources"
     group_by_column_name = sharings_column_name
 
-    def plot(num_agents, times):
-        times.plot(legend=True, style=STYLES[num_agents-2])
+    for (statistic, suffix) in [("max","_maxtime.png"), ("median","_medtime.png"), ("count","_count.png")]:
+        figure, axis = plt.subplots(1,1)
+        for num_agents in nums_agents:
+            results_numagents = results.loc[results.num_agents==num_agents]
+            times = results_numagents.groupby([group_by_column_name])[time_column_name].agg(statistic).rename(f"{num_agents} agents")
+            times.plot(ax=axis, legend=True, style=STYLES[num_agents-2])
         axis.set_xlabel("# sharings",fontsize=15)
         # axis.set_xlabel("# objects",fontsize=15)
         axis.set_ylabel("seconds",fontsize=15)
         axis.tick_params(axis='both', which='major', labelsize=12)
         axis.xaxis.set_major_locator(MaxNLocator(integer=True))
+        figure.savefig(output_file+suffix)
+        plt.close(figure)
 
 
-    axis.clear()
-    for num_agents in nums_agents:
-        results_numagents = results.loc[results.num_agents==num_agents]
-        plot(num_agents,
-            results_numagents.groupby([group_by_column_name])[time_column_name].max().rename(f"{num_agents} agents"))
-        plt.savefig(output_file+"_maxtime.png")
 
-    axis.clear()
-    for num_agents in nums_agents:
-        results_numagents = results.loc[results.num_agents==num_agents]
-        plot(num_agents,
-            results_numagents.groupby([group_by_column_name])[time_column_name].median().rename(f"{num_agents} agents"))
-        plt.savefig(output_file+"_medtime.png")
+PHASE_COLUMNS = {"enumeration_seconds": "graph enumeration", "lp_seconds": "solver calls", "spawn_seconds": "process spawn"}
 
-    axis.clear()
-    for num_agents in nums_agents:
-        results_numagents = results.loc[results.num_agents==num_agents]
-        plot(num_agents,
-            results_numagents.groupby([group_by_column_name])[time_column_name].count().rename(f"{num_agents} agents"))
-        plt.savefig(output_file+"_count.png")
+def plot_phases_by_sharing(session:AnalysisSession, figure_title:str, column_name:str, output_file:str):
+    """
+    Plot where the run-time goes as the number of sharings grows: the median time of each phase of the search,
+    and the median number of consumption graphs tried. Requires results made with profile=True (see make_results.py).
+    """
+    status_column_name =   column_name+"_status"
+    sharings_column_name = column_name+"_num_sharing"
+
+    results = session.results.loc[session.ok_or_timeout(status_column_name)]
+    results = results.loc[results[sharings_column_name] >= 0]
+    medians = results.groupby(sharings_column_name)[[column_name+"_"+phase for phase in PHASE_COLUMNS]+[column_name+"_num_graphs"]].median()
 
+    figure, (time_axis, graphs_axis) = plt.subplots(2,1, sharex=True)
+    time_axis.set_title(figure_title)
+    phase_times = medians[[column_name+"_"+phase for phase in PHASE_COLUMNS]].rename(columns={column_name+"_"+phase: label for phase,label in PHASE_COLUMNS.items()})
+    phase_times.plot.bar(ax=time_axis, stacked=True)
+    time_axis.set_ylabel("median seconds",fontsize=12)
+    medians[column_name+"_num_graphs"].plot.bar(ax=graphs_axis, color="gray")
+    graphs_axis.set_ylabel("median #graphs tried",fontsize=12)
+    graphs_axis.set_xlabel("# sharings",fontsize=12)
+    figure.savefig(output_file+"_phases.png")
+    plt.close(figure)
 
 
-def compare_sharings_by_agents(results_csv_file:str, column_name:str):
+
+def compare_sharings_by_agents(session:AnalysisSession, column_name:str):
     status_column_name =   column_name+"_status"
     sharings_column_name = column_name+"_num_sharing"
 
     max_num_agents = 8
     max_num_resources = 999
 
-    results = pandas.read_csv(results_csv_file)
-    results = results.loc[(results[status_column_name]=="OK") | (results[status_column_name]=="TimeOut")]
+    results = session.results.loc[session.ok_or_timeout(status_column_name)]
     results = results.loc[results.num_agents <= max_num_agents]
     results = results.loc[results.num_resources <= max_num_resources]
 
@@ -317,16 +339,14 @@ def compare_sharings_by_agents(results_csv_file:str, column_name:str):
 
 
 
-def plot_time_by_agents(results_csv_file:str, figure_title:str, column_name:str, output_file:str):
+def plot_time_by_agents(session:AnalysisSession, figure_title:str, column_name:str, output_file:str):
     status_column_name =   column_name+"_status"
     time_column_name =     column_name+"_time_in_seconds"
 
     max_num_resources = 999
     max_num_agents = 8
 
-    results = pandas.read_csv(results_csv_file)
-
-    results = results.loc[(results[status_column_name]=="OK") | (results[status_column_name]=="TimeOut")]
+    results = session.results.loc[session.ok_or_timeout(status_column_name)]
     results = results.loc[results["num_resources"] <= max_num_resources]
     results = results.loc[results["num_agents"] <= max_num_agents]
 
@@ -334,55 +354,102 @@ def plot_time_by_agents(results_csv_file:str, figure_title:str, column_name:str,
     #     time_column_name =     column_name+"_time_in_seconds"
     #     results[time_column_name] = results[time_column_name].apply(np.log)
 
-    _, axis = plt.subplots(1,1)
-    axis.set_title(figure_title)
-    axis.clear()
-    results.groupby(["num_agents"])["prop_time_in_seconds"].median().rename(f"fPO+PROP").plot(legend=True, style="b-+", logy=True)
-    results.groupby(["num_agents"])["ef_time_in_seconds"].median().rename(f"fPO+EF").plot(legend=True, style="g-o", logy=True)
-    results.groupby(["num_agents"])["maxprod1_time_in_seconds"].median().rename(f"0.999-CEEI").plot(legend=True, style="r-", logy=True)
+    figure, axis = plt.subplots(1,1)
+    results.groupby(["num_agents"])["prop_time_in_seconds"].median().rename(f"fPO+PROP").plot(ax=axis, legend=True, style="b-+", logy=True)
+    results.groupby(["num_agents"])["ef_time_in_seconds"].median().rename(f"fPO+EF").plot(ax=axis, legend=True, style="g-o", logy=True)
+    results.groupby(["num_agents"])["maxprod1_time_in_seconds"].median().rename(f"0.999-CEEI").plot(ax=axis, legend=True, style="r-", logy=True)
     axis.set_xlabel("# agents",fontsize=12)
     axis.set_ylabel("Median run-time [seconds]",fontsize=12)
-    plt.savefig(output_file+".pdf", format="pdf")
+    figure.savefig(output_file+".pdf", format="pdf")
+    plt.close(figure)
 
 
-def analysis_for_operations_research_paper(folder, results_file):
-    plot_time_by_agents(results_file, "Log median time to find a min-sharing PROP allocation", "prop", folder + "/runtime")
-    plot_results_by_agents(results_file, "Minimum #sharings in a PROP allocation", "prop", folder + "/sharing_prop")
-    plot_results_by_agents(results_file, "Minimum #sharings in an EF allocation", "ef", folder + "/sharing_ef")
-    plot_results_by_agents(results_file, "Minimum #sharings in a 0.999-CEEI allocation", "maxprod1", folder + "/sharing_ceei")
-
-
-def analysis_for_random_instances():
-    folder = "7-results-random"
-    results_file = folder+"/99sec.csv"
-    
-    print_buggy_instances(results_file)
+_worker_session = None   # the session of a figure-rendering worker process.
 
-    print_results_by_numagents_and_status(results_file,"prop_status", folder+"/timeout_agents_prop.csv")
-    print_results_by_numagents_and_status(results_file,"ef_status", folder+"/timeout_agents_ef.csv")
+def _set_worker_session(session:AnalysisSession):
+    global _worker_session
+    _worker_session = session
 
-    print_results_by_numresources_and_status(results_file,"prop_status", folder+"/timeout_resources_prop.csv")
-    print_results_by_numresources_and_status(results_file,"ef_status", folder+"/timeout_resources_ef.csv")
+def _render_figure(plot_function, args:tuple):
+    plot_function(_worker_session, *args)
 
-    print_results_by_numagentsresources_and_status(results_file,"prop_status", folder+"/timeout_nums_prop.csv")
-    print_results_by_numagentsresources_and_status(results_file,"ef_status", folder+"/timeout_nums_ef.csv")
 
-    plot_time_by_resources(results_file, "Median time to find a min-sharing PROP allocation", "prop", folder + "/prop")
-    plot_time_by_resources(results_file, "Median time to find a min-sharing EF allocation", "ef", folder + "/ef")
-    plot_time_by_resources(results_file, "Median time to find a min-sharing 0.999-CEEI allocation", "maxprod1", folder + "/ceei")
+def render_figures(session:AnalysisSession, figures:List[tuple], num_workers:int=None):
+    """
+    Render independent figures in a pool of worker processes. The session is sent once to each worker.
 
-    plot_time_by_agents(results_file, "Log median time to find a min-sharing PROP allocation", "prop", folder + "/runtime")
+    :param figures: a list of tuples (plot_function, *args); each figure is rendered by plot_function(session, *args).
+    :param num_workers: number of worker processes. Default: the number of CPUs. If 1, the figures are rendered in the current process.
+    """
+    if num_workers==1:
+        for (plot_function, *args) in figures:
+            plot_function(session, *args)
+        return
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_set_worker_session, initargs=(session,)) as executor:
+        futures = [executor.submit(_render_figure, plot_function, tuple(args)) for (plot_function, *args) in figures]
+        for future in futures:
+            future.result()
 
-    plot_results_by_agents(results_file, "Minimum #sharings in a PROP allocation", "prop", folder + "/sharing_prop.png")
-    plot_results_by_agents(results_file, "Minimum #sharings in an EF allocation", "ef", folder + "/sharing_ef.png")
-    plot_results_by_agents(results_file, "Minimum #sharings in a 0.999-CEEI allocation", "maxprod1", folder + "/sharing_ceei.png")
 
-    compare_sharings_by_agents(results_file,  "prop")
-    compare_sharings_by_agents(results_file,  "ef")
+def analysis_for_operations_research_paper(folder, results_file, incremental=True):
+    """
+    :param incremental: if True, regenerate only the figures whose input rows changed since the previous analysis (see incremental_analysis.py).
+    """
+    figures = [
+        (plot_time_by_agents, "Log median time to find a min-sharing PROP allocation", "prop", folder + "/runtime"),
+        (plot_results_by_agents, "Minimum #sharings in a PROP allocation", "prop", folder + "/sharing_prop"),
+        (plot_results_by_agents, "Minimum #sharings in an EF allocation", "ef", folder + "/sharing_ef"),
+        (plot_results_by_agents, "Minimum #sharings in a 0.999-CEEI allocation", "maxprod1", folder + "/sharing_ceei"),
+    ]
+    if incremental:
+        from incremental_analysis import update_analysis
+        update_analysis(folder, results_file, [], figures)
+    else:
+        render_figures(AnalysisSession(results_file), figures)
+
+
+def analysis_for_random_instances(incremental=True):
+    """
+    :param incremental: if True, regenerate only the tables and figures whose input rows changed since the previous analysis (see incremental_analysis.py).
+    """
+    folder = "7-results-random"
+    results_file = folder+"/99sec.csv"
+    status_table_outputs = [
+        (["num_agents"], {"prop_status": folder+"/timeout_agents_prop.csv", "ef_status": folder+"/timeout_agents_ef.csv", "maxprod1_status": folder+"/timeout_agents_ceei.csv"}),
+        (["num_resources"], {"prop_status": folder+"/timeout_resources_prop.csv", "ef_status": folder+"/timeout_resources_ef.csv", "maxprod1_status": folder+"/timeout_resources_ceei.csv"}),
+        (["num_agents","num_resources"], {"prop_status": folder+"/timeout_nums_prop.csv", "ef_status": folder+"/timeout_nums_ef.csv", "maxprod1_status": folder+"/timeout_nums_ceei.csv"}),
+    ]
+    figures = [
+        (plot_time_by_resources, "Median time to find a min-sharing PROP allocation", "prop", folder + "/prop"),
+        (plot_time_by_resources, "Median time to find a min-sharing EF allocation", "ef", folder + "/ef"),
+        (plot_time_by_resources, "Median time to find a min-sharing 0.999-CEEI allocation", "maxprod1", folder + "/ceei"),
+        (plot_time_by_agents, "Log median time to find a min-sharing PROP allocation", "prop", folder + "/runtime"),
+        (plot_results_by_agents, "Minimum #sharings in a PROP allocation", "prop", folder + "/sharing_prop.png"),
+        (plot_results_by_agents, "Minimum #sharings in an EF allocation", "ef", folder + "/sharing_ef.png"),
+        (plot_results_by_agents, "Minimum #sharings in a 0.999-CEEI allocation", "maxprod1", folder + "/sharing_ceei.png"),
+    ]
+
+    if incremental:
+        from incremental_analysis import update_analysis
+        (new_rows, session) = update_analysis(folder, results_file, status_table_outputs, figures)
+        print_buggy_instances(new_rows)
+        if session is None:
+            if len(new_rows.results) == 0:
+                return   # nothing changed.
+            session = AnalysisSession(results_file)   # rows were appended, but no figure changed; the comparison below still needs all rows.
+    else:
+        session = AnalysisSession(results_file)
+        print_buggy_instances(session)
+        for (keys, output_files) in status_table_outputs:
+            print_status_tables(session, keys, output_files)
+        render_figures(session, figures)
+
+    compare_sharings_by_agents(session,  "prop")
+    compare_sharings_by_agents(session,  "ef")
 
 
 
 if __name__ == "__main__":
     folder = "results_random" # "results" # 
-    results_file = folder+"/99sec.csv" # folder+"/999sec.csv" # 
+    results_file = folder+"/99sec_uniform.csv" # folder+"/999sec.csv" # 
     analysis_for_operations_research_paper(folder, results_file)
@@ -0,0 +1,179 @@
+"""
+A benchmark suite for the min-sharing solvers.
+
+Each named instance set is fixed: the random sets are generated from a fixed seed, and the Spliddit set is a fixed list of instance ids.
+Every instance is solved several times (without the result store), and the median and 95th-percentile times
+and the median number of sharings of each solver are reported.
+A summary can be stored as a baseline; later runs are compared to it, and regressions
+(slower solvers, or a different number of sharings) are flagged.
+
+Usage:
+
+    python benchmark.py small                    # run the "small" set and compare to its baseline (if any).
+    python benchmark.py small --save-baseline    # run the "small" set and store the results as its baseline.
+    python benchmark.py small --min-sharing-search   # solve with the search of min_sharing_search.py instead of fairpy (see solvers.solve).
+
+The exit code is 1 if a regression was found.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import argparse, os, platform, sys
+from datetime import datetime
+from typing import List, Tuple
+
+import numpy as np
+import pandas
+
+from fairpy import ValuationMatrix
+from solvers import solve_all, SOLVER_NAMES
+from random_instances import random_valuations
+
+import logging
+logger = logging.getLogger(__name__)
+
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.INFO)
+
+BASELINE_FOLDER = "benchmarks"
+
+# Random sets: `count` instances of each (num_agents, num_resources) shape, generated by `random_instances.random_valuation` with the given seed.
+INSTANCE_SETS = {
+    "small":  {"seed": 1, "count": 5, "shapes": [(2,3), (2,5), (3,3)]},
+    "medium": {"seed": 2, "count": 5, "shapes": [(3,5), (4,4), (4,6)]},
+    "hard":   {"seed": 3, "count": 3, "shapes": [(5,6), (5,8), (6,6)]},
+}
+# Spliddit instances with 2-4 agents, for which all solvers finished within 2 seconds in results/999sec.csv.
+SPLIDDIT_INSTANCE_IDS = [209, 223, 317, 337, 338, 357, 432, 438, 340, 361, 362, 465, 503, 644, 765, 999, 3156, 3233, 17208, 21645]
+
+REGRESSION_TOLERANCE = 0.25       # a time is a regression if it is more than 25% above the baseline,
+REGRESSION_MIN_SECONDS = 0.05     # and more than this many seconds above it (so that noise in tiny times is ignored).
+
+
+def benchmark_instances(set_name:str)->List[Tuple[str,np.ndarray]]:
+    """
+    :return a list of (instance name, valuation matrix).
+
+    >>> [name for (name,_) in benchmark_instances("small")][:3]
+    ['small-2x3-0', 'small-2x3-1', 'small-2x3-2']
+    >>> bool(np.all(benchmark_instances("small")[0][1] == benchmark_instances("small")[0][1]))
+    True
+    """
+    if set_name=="spliddit":
+        from spliddit import spliddit_instance
+        return [(f"spliddit-{instance_id}", np.asarray(spliddit_instance(instance_id))) for instance_id in SPLIDDIT_INSTANCE_IDS]
+    instance_set = INSTANCE_SETS[set_name]
+    return [(f"{set_name}-{num_agents}x{num_resources}-{index}", valuations)
+            for (num_agents, num_resources) in instance_set["shapes"]
+            for (index, valuations) in enumerate(random_valuations(range(instance_set["count"]), num_agents, num_resources, base_seed=instance_set["seed"]))]
+
+
+def run_benchmark(set_name:str, repeats:int=3, time_limit_in_seconds:float=60, min_sharing_search:bool=False)->pandas.DataFrame:
+    """
+    Solve every instance of the set `repeats` times, with all solvers.
+    :param min_sharing_search: if True, the solvers use the search of min_sharing_search.py (see `solvers.solve`).
+    :return a DataFrame with a row per (instance, repeat, solver).
+    """
+    runs = []
+    for (instance_name, valuations) in benchmark_instances(set_name):
+        valuation_matrix = ValuationMatrix(valuations)
+        for repeat in range(repeats):
+            solutions = solve_all(valuation_matrix, time_limit_in_seconds, result_store=None, min_sharing_search=min_sharing_search)
+            for solver_name, (status, time_in_seconds, allocation) in solutions.items():
+                runs.append({"instance": instance_name, "repeat": repeat, "solver": solver_name,
+                    "status": status, "time_in_seconds": time_in_seconds, "num_sharing": allocation.num_of_sharings()})
+        logger.info("%s: %s", instance_name, {solver_name: solutions[solver_name][0] for solver_name in SOLVER_NAMES})
+    return pandas.DataFrame(runs)
+
+
+def summarize(runs:pandas.DataFrame)->pandas.DataFrame:
+    """
+    :return a DataFrame with a row per solver: median and 95th-percentile time (of the per-instance medians),
+            the total of the per-instance median #sharings, and the number of runs that did not finish OK.
+
+    >>> runs = pandas.DataFrame({"instance": ["a","a","b","b"], "repeat": [0,1,0,1], "solver": ["prop"]*4,
+    ...     "status": ["OK","OK","OK","TimeOut"], "time_in_seconds": [1.0,3.0,5.0,7.0], "num_sharing": [1,1,0,-1]})
+    >>> summarize(runs)
+      solver  median_time  p95_time  total_num_sharing  num_failed
+    0   prop          4.0       5.8                1.0           1
+    """
+    per_instance = runs.groupby(["solver","instance"]).agg(
+        time_in_seconds=("time_in_seconds","median"),
+        num_sharing=("num_sharing", lambda values: values[values>=0].median()),
+        num_failed=("status", lambda statuses: int((statuses!="OK").sum())))
+    return per_instance.groupby("solver").agg(
+        median_time=("time_in_seconds","median"),
+        p95_time=("time_in_seconds", lambda times: times.quantile(0.95)),
+        total_num_sharing=("num_sharing","sum"),
+        num_failed=("num_failed","sum")).reset_index()
+
+
+def baseline_file(set_name:str)->str:
+    return os.path.join(BASELINE_FOLDER, f"baseline_{set_name}.csv")
+
+
+def fairpy_version()->str:
+    try:
+        from importlib.metadata import version
+        return version("fairpy")
+    except Exception:
+        return "unknown"
+
+
+def save_baseline(set_name:str, summary:pandas.DataFrame):
+    os.makedirs(BASELINE_FOLDER, exist_ok=True)
+    summary.assign(fairpy_version=fairpy_version(), machine=platform.node(), date=datetime.now().isoformat(timespec="seconds")).to_csv(baseline_file(set_name), index=False)
+
+
+def find_regressions(summary:pandas.DataFrame, baseline:pandas.DataFrame)->List[str]:
+    """
+    Compare a summary to a baseline.
+    :return a list of messages, one per regression.
+
+    >>> baseline = pandas.DataFrame({"solver": ["prop","ef"], "median_time": [1.0,1.0], "p95_time": [2.0,2.0], "total_num_sharing": [3.0,4.0], "num_failed": [0,0]})
+    >>> summary = pandas.DataFrame({"solver": ["prop","ef"], "median_time": [1.1,2.0], "p95_time": [2.0,2.0], "total_num_sharing": [3.0,5.0], "num_failed": [0,1]})
+    >>> for message in find_regressions(summary, baseline): print(message)
+    ef: median_time 2.000 > baseline 1.000
+    ef: total_num_sharing 5.0 != baseline 4.0
+    ef: num_failed 1 > baseline 0
+    """
+    messages = []
+    merged = summary.merge(baseline, on="solver", suffixes=("", "_baseline"))
+    for row in merged.itertuples():
+        for column in ["median_time", "p95_time"]:
+            (value, baseline_value) = (getattr(row, column), getattr(row, column+"_baseline"))
+            if value > baseline_value*(1+REGRESSION_TOLERANCE) and value-baseline_value > REGRESSION_MIN_SECONDS:
+                messages.append(f"{row.solver}: {column} {value:.3f} > baseline {baseline_value:.3f}")
+        if row.total_num_sharing != row.total_num_sharing_baseline:
+            messages.append(f"{row.solver}: total_num_sharing {row.total_num_sharing} != baseline {row.total_num_sharing_baseline}")
+        if row.num_failed > row.num_failed_baseline:
+            messages.append(f"{row.solver}: num_failed {row.num_failed} > baseline {row.num_failed_baseline}")
+    return messages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the min-sharing solvers on a fixed instance set.")
+    parser.add_argument("set_name", choices=[*INSTANCE_SETS, "spliddit"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--time-limit", type=float, default=60)
+    parser.add_argument("--min-sharing-search", action="store_true", help="solve with the search of min_sharing_search.py instead of fairpy.")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline of this set.")
+    args = parser.parse_args()
+
+    summary = summarize(run_benchmark(args.set_name, args.repeats, args.time_limit, args.min_sharing_search))
+    print(summary.to_string(index=False))
+    if args.save_baseline:
+        save_baseline(args.set_name, summary)
+        print("Saved baseline to", baseline_file(args.set_name))
+    elif os.path.isfile(baseline_file(args.set_name)):
+        baseline = pandas.read_csv(baseline_file(args.set_name))
+        print(f"Baseline: fairpy {baseline['fairpy_version'][0]} on {baseline['machine'][0]}, {baseline['date'][0]}")
+        regressions = find_regressions(summary, baseline)
+        for message in regressions:
+            print("REGRESSION:", message)
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+    else:
+        print("No baseline for this set; run with --save-baseline to store one.")
@@ -0,0 +1,67 @@
+"""
+A check that the min-sharing search of min_sharing_search.py agrees with the search of fairpy itself.
+
+min_sharing_search.py drives the internals of the fairpy `Fair*AllocationProblem` classes (their graph generator and
+`find_allocation_for_graph`), so it should be re-checked whenever fairpy is upgraded.
+For a few Spliddit instances, every solver is run both with `problem.find_min_sharing_allocation_with_time_limit` of fairpy
+and with `min_sharing_search.find_min_sharing_allocation_with_time_limit` (without bounds), and the statuses and numbers of sharings are compared.
+
+Usage:
+
+    python check_min_sharing_search.py            # check the first 5 instances of benchmark.SPLIDDIT_INSTANCE_IDS
+    python check_min_sharing_search.py 209 223    # check the given instances
+
+The exit code is 1 if a mismatch was found.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import sys
+from typing import List
+
+import pandas
+
+from fairpy.valuations import ValuationMatrix
+
+from min_sharing_search import find_min_sharing_allocation_with_time_limit
+from solvers import make_problem, SOLVER_NAMES
+from spliddit import spliddit_instance
+from benchmark import SPLIDDIT_INSTANCE_IDS
+
+import logging
+logger = logging.getLogger(__name__)
+
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.INFO)
+
+NUM_OF_DEFAULT_INSTANCES = 5
+
+
+def compare_with_fairpy(instance_ids:List[int], time_limit_in_seconds:float=60)->pandas.DataFrame:
+    """
+    :return a DataFrame with a row per (instance, solver), with the status and number of sharings of each search,
+            and the column "match" - False if both searches finished, and their statuses or numbers of sharings differ.
+    """
+    rows = []
+    for instance_id in instance_ids:
+        valuation_matrix = ValuationMatrix(spliddit_instance(instance_id))
+        for solver_name in SOLVER_NAMES:
+            (fairpy_status, _, fairpy_allocation) = make_problem(solver_name, valuation_matrix).find_min_sharing_allocation_with_time_limit(time_limit_in_seconds=time_limit_in_seconds)
+            (status, _, allocation) = find_min_sharing_allocation_with_time_limit(make_problem(solver_name, valuation_matrix), time_limit_in_seconds)
+            finished = "TimeOut" not in [fairpy_status, status]
+            match = not finished or (fairpy_status==status and fairpy_allocation.num_of_sharings()==allocation.num_of_sharings())
+            rows.append({"instance_id": instance_id, "solver": solver_name,
+                "fairpy_status": fairpy_status, "fairpy_num_sharing": fairpy_allocation.num_of_sharings(),
+                "status": status, "num_sharing": allocation.num_of_sharings(), "match": match})
+            if not match:
+                logger.warning("Instance %s, solver %s: fairpy returned %s with %s sharings, but the search returned %s with %s sharings",
+                    instance_id, solver_name, fairpy_status, fairpy_allocation.num_of_sharings(), status, allocation.num_of_sharings())
+    return pandas.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    instance_ids = [int(arg) for arg in sys.argv[1:]] or SPLIDDIT_INSTANCE_IDS[:NUM_OF_DEFAULT_INSTANCES]
+    comparison = compare_with_fairpy(instance_ids)
+    print(comparison.to_string(index=False))
+    sys.exit(0 if comparison["match"].all() else 1)
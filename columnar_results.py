@@ -0,0 +1,156 @@
+"""
+A columnar (Parquet) backend for experiment results.
+
+A results "file" in this format is a folder of Parquet part files.
+While a sweep runs, each new row is appended as a small part file, so an interrupted (even killed) sweep loses nothing
+and can be resumed as with CSV files. `compact` merges the parts into a single file with large row groups.
+Reading many small parts is much slower than reading one file, so an experiment compacts its folder when it is loaded,
+and whenever it has more than MAX_PART_FILES parts.
+Reading can be restricted to some of the columns, so that an analysis parses only the columns it needs.
+
+Requires pyarrow (or fastparquet) for pandas.read_parquet / DataFrame.to_parquet.
+
+Usage, for converting an existing CSV file:
+
+    python columnar_results.py results/999sec.csv
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import glob, os, pathlib, shutil, sys
+from datetime import datetime
+from typing import List
+
+import pandas
+from experiments_csv import Experiment
+
+import logging
+logger = logging.getLogger(__name__)
+
+ROW_GROUP_SIZE = 100000
+MAX_PART_FILES = 100
+
+
+def is_columnar(results_file:str)->bool:
+    return not results_file.endswith(".csv")
+
+
+def part_files(results_folder:str)->List[str]:
+    return sorted(glob.glob(os.path.join(results_folder, "part-*.parquet")))
+
+
+def result_columns(results_file:str)->List[str]:
+    """
+    The column names of a results file, read without reading any rows.
+    """
+    if not is_columnar(results_file):
+        return list(pandas.read_csv(results_file, nrows=0).columns)
+    import pyarrow.parquet
+    schema_file = results_file if os.path.isfile(results_file) else part_files(results_file)[0]
+    return pyarrow.parquet.read_schema(schema_file).names
+
+
+def read_results(results_file:str, columns:List[str]=None)->pandas.DataFrame:
+    """
+    Read a results file - either CSV or columnar - optionally reading only the given columns.
+    """
+    if not is_columnar(results_file):
+        return pandas.read_csv(results_file, usecols=columns)
+    if os.path.isfile(results_file):
+        return pandas.read_parquet(results_file, columns=columns)
+    # The parts are read one by one, since different parts may have different dtypes (e.g. an int 0 product in a float column).
+    parts = [pandas.read_parquet(part_file, columns=columns) for part_file in part_files(results_file)]
+    if not parts:
+        return pandas.DataFrame(columns=columns)
+    return pandas.concat(parts, ignore_index=True)
+
+
+def write_part(results_folder:str, rows:pandas.DataFrame):
+    pathlib.Path(results_folder).mkdir(parents=True, exist_ok=True)
+    existing_parts = part_files(results_folder)
+    next_number = int(os.path.basename(existing_parts[-1])[5:-8])+1 if existing_parts else 0
+    part_file = os.path.join(results_folder, f"part-{next_number:05d}.parquet")
+    rows.to_parquet(part_file+".tmp", index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(part_file+".tmp", part_file)   # so that a reader never sees a partially-written part.
+
+
+def compact(results_folder:str):
+    """
+    Merge all part files of a columnar results folder into a single part.
+    """
+    existing_parts = part_files(results_folder)
+    if len(existing_parts) <= 1:
+        return
+    results = read_results(results_folder)
+    merged_file = os.path.join(results_folder, "merged.parquet.tmp")
+    results.to_parquet(merged_file, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(merged_file, existing_parts[-1])   # the merged part replaces the last part before the others are removed, so no row is ever missing.
+    for part_file in existing_parts[:-1]:
+        os.remove(part_file)
+
+
+def convert_csv_to_columnar(csv_file:str, results_folder:str=None)->str:
+    """
+    Convert a CSV results file into a columnar results folder (by default, with the same name and extension ".parquet").
+    :return the path of the new results folder.
+    """
+    results_folder = results_folder or os.path.splitext(csv_file)[0] + ".parquet"
+    if os.path.exists(results_folder):
+        raise FileExistsError(f"{results_folder} already exists")
+    write_part(results_folder, pandas.read_csv(csv_file))
+    return results_folder
+
+
+class ColumnarExperiment(Experiment):
+    """
+    An experiments_csv.Experiment whose results are stored in a columnar results folder instead of a CSV file.
+    It can be used with `Experiment.run` and `parallel_experiment.run_parallel`.
+    """
+    def __init__(self, results_folder="results", results_filename="results.parquet", backup_folder="results_backup"):
+        os.makedirs(results_folder, exist_ok=True)
+        results_file = os.path.join(results_folder, results_filename)
+        if os.path.exists(results_file):
+            if backup_folder is not None:
+                modification_datetime = datetime.fromtimestamp(os.path.getmtime(results_file)).strftime("%Y_%m_%d__%H_%M_%S")
+                backup_file = os.path.join(backup_folder, results_filename.replace(".parquet", f".{modification_datetime}.parquet"))
+                if not os.path.exists(backup_file):
+                    shutil.copytree(results_file, backup_file)
+            compact(results_file)
+            self.dataFrame = read_results(results_file)
+            logger.info("Loaded %d rows from %s.", self.dataFrame.shape[0], results_file)
+        else:
+            self.dataFrame = None
+            logger.info("Initialized an empty DataFrame bound to %s.", results_file)
+        self.results_file = results_file
+
+    def add(self, new_row:dict):
+        """
+        Add a row to the in-memory table, and append it to the results folder as a new part.
+        """
+        if self.dataFrame is None:
+            self.dataFrame = pandas.DataFrame(columns=list(new_row.keys()))
+        self.dataFrame.loc[self.dataFrame.shape[0]] = pandas.Series(new_row)
+        write_part(self.results_file, pandas.DataFrame([new_row]))
+        if len(part_files(self.results_file)) > MAX_PART_FILES:
+            compact(self.results_file)
+
+    def compact(self):
+        compact(self.results_file)
+
+
+def make_experiment(results_folder:str, results_filename:str, backup_folder:str)->Experiment:
+    """
+    Create an Experiment that stores its results in CSV format, or in columnar format if the file name does not end with ".csv".
+    """
+    if is_columnar(results_filename):
+        return ColumnarExperiment(results_folder, results_filename, backup_folder)
+    else:
+        return Experiment(results_folder, results_filename, backup_folder)
+
+
+if __name__ == "__main__":
+    if len(sys.argv)<2:
+        print("SYNTAX: python columnar_results.py <results>.csv")
+        sys.exit(1)
+    print("Created", convert_csv_to_columnar(sys.argv[1]))
@@ -0,0 +1,147 @@
+"""
+Detect instances that are equivalent up to a permutation of the agents, a permutation of the resources,
+and scaling of each agent's valuations, so that each equivalence class is solved only once.
+
+Each instance is mapped to a hash of a canonical form. Equivalent instances usually get the same hash;
+instances with the same hash are always equivalent (the canonical form is itself equivalent to the instance),
+so a result is never reused for an instance that is not equivalent.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import hashlib, os
+from typing import Dict, List
+
+import numpy as np
+import pandas
+
+from experiments_csv import Experiment
+from experiments_csv.dict_to_row import dict_to_row
+from parallel_experiment import pending_inputs
+
+NUM_OF_DECIMAL_DIGITS = 9   # normalized values are rounded, so that floating-point noise does not change the hash.
+
+
+def row_scales(valuation_matrix:np.ndarray)->np.ndarray:
+    """
+    The factor by which each row is divided in the canonical form: the sum of absolute values (or 1 for an all-zero row).
+    """
+    scales = np.abs(valuation_matrix).sum(axis=1)
+    scales[scales==0] = 1
+    return scales
+
+
+def canonical_form(valuation_matrix:np.ndarray)->np.ndarray:
+    """
+    Normalize each row to sum 1, and then sort the rows and columns lexicographically, alternately, until neither order changes.
+    The columns are first ordered by their sorted values, which do not depend on the order of the rows.
+
+    >>> canonical_form(np.array([[1,3],[2,2]]))
+    array([[0.25, 0.75],
+           [0.5 , 0.5 ]])
+    >>> canonical_form(np.array([[5,5],[6,2]]))   # the same instance, with agents and resources swapped and values scaled.
+    array([[0.25, 0.75],
+           [0.5 , 0.5 ]])
+    """
+    matrix = np.asarray(valuation_matrix, dtype=float)
+    matrix = np.round(matrix / row_scales(matrix)[:,None], NUM_OF_DECIMAL_DIGITS) + 0.0   # "+0.0" turns -0.0 into 0.0.
+    if matrix.size==0:
+        return matrix
+    matrix = matrix[:, lexicographic_order(np.sort(matrix, axis=0).T)]
+    for _ in range(sum(matrix.shape)):
+        row_order = lexicographic_order(matrix)
+        matrix = matrix[row_order]
+        column_order = lexicographic_order(matrix.T)
+        matrix = matrix[:, column_order]
+        if np.all(row_order==np.arange(len(row_order))) and np.all(column_order==np.arange(len(column_order))):
+            break
+    return matrix
+
+
+def lexicographic_order(matrix:np.ndarray)->np.ndarray:
+    """
+    >>> lexicographic_order(np.array([[2,1],[1,5],[1,3]]))
+    array([2, 1, 0])
+    """
+    return np.lexsort(matrix.T[::-1])
+
+
+def canonical_hash(valuation_matrix:np.ndarray)->str:
+    canonical = canonical_form(valuation_matrix)
+    digest = hashlib.sha1(np.array(canonical.shape, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(canonical).tobytes())
+    return digest.hexdigest()
+
+
+def build_hash_index(instance_ids:List[int], get_instance, index_file:str)->pandas.DataFrame:
+    """
+    Compute the canonical hash of each instance, and store them in index_file.
+    Instances already in the index file are not recomputed.
+    :param get_instance: maps an instance_id to its valuation matrix.
+    :return a DataFrame with columns instance_id, canonical_hash, scale_product:
+            the product of the row scales, by which the product of utilities of an equivalent instance is multiplied.
+    """
+    if os.path.isfile(index_file):
+        index = pandas.read_csv(index_file)
+    else:
+        index = pandas.DataFrame(columns=["instance_id", "canonical_hash", "scale_product"])
+    missing_ids = sorted(set(instance_ids) - set(index["instance_id"]))
+    if missing_ids:
+        new_rows = []
+        for instance_id in missing_ids:
+            valuation_matrix = np.asarray(get_instance(instance_id))
+            new_rows.append({"instance_id": instance_id, "canonical_hash": canonical_hash(valuation_matrix), "scale_product": np.prod(row_scales(valuation_matrix))})
+        index = pandas.DataFrame(new_rows) if len(index)==0 else pandas.concat([index, pandas.DataFrame(new_rows)], ignore_index=True)
+        index.to_csv(index_file, index=False)
+    return index.loc[index["instance_id"].isin(instance_ids)]
+
+
+def map_duplicates_to_representatives(hash_index:pandas.DataFrame)->Dict[int,int]:
+    """
+    Map each instance, except the first instance of each equivalence class, to the first instance in its class.
+
+    >>> map_duplicates_to_representatives(pandas.DataFrame({"instance_id": [5,3,8,9], "canonical_hash": ["a","b","a","a"]}))
+    {8: 5, 9: 5}
+    """
+    representatives = hash_index.groupby("canonical_hash")["instance_id"].transform("min")
+    duplicates = hash_index["instance_id"] != representatives
+    return dict(zip(hash_index.loc[duplicates, "instance_id"].tolist(), representatives[duplicates].tolist()))
+
+
+def duplicate_row(representative_row:dict, representative_id:int, scale_ratio:float)->dict:
+    """
+    Create the outputs of a duplicate instance from the outputs of its representative.
+    The number of sharings does not change; the product of utilities is multiplied by the ratio of the row scales.
+
+    >>> duplicate_row({"prop_status": "OK", "prop_time_in_seconds": 0.5, "prop_num_sharing": 1, "prop_product": 6.0}, 17, 2.0)
+    {'prop_status': 'Duplicate-of:17', 'prop_time_in_seconds': -1, 'prop_num_sharing': 1, 'prop_product': 12.0}
+    """
+    row = {}
+    solver_names = [column[:-len("_status")] for column in representative_row if column.endswith("_status")]
+    for solver_name in solver_names:
+        row[f"{solver_name}_status"] = f"Duplicate-of:{representative_id}"
+        row[f"{solver_name}_time_in_seconds"] = -1
+        row[f"{solver_name}_num_sharing"] = representative_row[f"{solver_name}_num_sharing"]
+        row[f"{solver_name}_product"] = representative_row[f"{solver_name}_product"] * scale_ratio
+    return row
+
+
+def add_duplicate_rows(experiment:Experiment, duplicates:Dict[int,int], hash_index:pandas.DataFrame, input_ranges:dict):
+    """
+    Add a row for each duplicate instance that does not have one yet, based on the row of its representative
+    (with the same values of the other inputs, e.g. time_limit_in_seconds).
+    Duplicates whose representative has no row yet are skipped.
+    """
+    if experiment.dataFrame is None:
+        return
+    scale_products = dict(zip(hash_index["instance_id"], hash_index["scale_product"]))
+    for input in pending_inputs(experiment, {**input_ranges, "instance_id": sorted(duplicates)}):
+        instance_id = input["instance_id"]
+        representative_id = duplicates[instance_id]
+        representative_row = dict_to_row(experiment.dataFrame, {**input, "instance_id": representative_id})
+        if representative_row is None:
+            continue
+        outputs = {column:value for column,value in representative_row.items() if column not in input}
+        scale_ratio = scale_products[instance_id] / scale_products[representative_id]
+        experiment.add({**input, **outputs, **duplicate_row(outputs, representative_id, scale_ratio)})
@@ -0,0 +1,170 @@
+"""
+Escalating time budgets: run every instance with a small time-limit, then re-run only the instances that timed out
+with a 10 times larger limit, and so on up to a cap.
+
+Each round adds rows with its budget in the time_limit_in_seconds column, and the column resolved_budget:
+the budget of the round if no solver timed out in it, or -1 otherwise.
+Solvers that finished in an earlier round are not solved again when the result store is used - their stored results are reused.
+The results of a sweep with a single time-limit T can be derived from the escalating sweep (for every time-limit T, not only the budgets):
+for each instance, take the row of the largest budget that is at most T, with the solvers that finished within T in the next round (see `time_limit_view`).
+
+To derive a view:
+
+    python escalation.py results/escalating.csv 100 results/100sec_view.csv
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import functools, logging, sys
+from typing import Any, Callable, Dict, List
+
+import pandas
+
+from experiments_csv import Experiment
+from experiments_csv.Experiment import normalized
+from experiments_csv.dict_to_row import dict_to_rows
+
+from parallel_experiment import run_parallel
+
+logger = logging.getLogger(__name__)
+
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.INFO)
+
+ESCALATION_FACTOR = 10
+
+
+def escalating_budgets(first_budget:float=1, cap:float=999, factor:float=ESCALATION_FACTOR)->List[float]:
+    """
+    >>> escalating_budgets(1, 999)
+    [1, 10, 100, 999]
+    >>> escalating_budgets(1, 100)
+    [1, 10, 100]
+    """
+    budgets = []
+    budget = first_budget
+    while budget < cap:
+        budgets.append(budget)
+        budget *= factor
+    return budgets + [cap]
+
+
+def is_resolved(output:dict)->bool:
+    """
+    >>> is_resolved({"prop_status": "OK", "ef_status": "Error"})
+    True
+    >>> is_resolved({"prop_status": "OK", "ef_status": "TimeOut"})
+    False
+    """
+    return not any(value=="TimeOut" for (column,value) in output.items() if column.endswith("_status"))
+
+
+def run_with_resolved_budget(single_run:Callable[..., dict], **input)->dict:
+    """
+    Run single_run, and add the resolved_budget column to its output.
+    """
+    output = single_run(**input)
+    output["resolved_budget"] = input["time_limit_in_seconds"] if is_resolved(output) else -1
+    return output
+
+
+def run_escalating(experiment:Experiment, single_run:Callable[..., dict], input_ranges:Dict[str,List[Any]], budgets:List[float],
+        num_workers:int=None, schedule:Callable[[List[dict]],List[dict]]=None, monitor=None):
+    """
+    Like `parallel_experiment.run_parallel`, with escalating time budgets.
+
+    :param single_run: a module-level function, that accepts the input time_limit_in_seconds.
+    :param input_ranges: the input ranges, without time_limit_in_seconds.
+    :param budgets: the time-limits of the rounds, in increasing order (e.g. `escalating_budgets()`).
+    :param schedule: an optional schedule for each round (e.g. `schedule.runtime_schedule`); it gets only the instances of the round.
+
+    >>> import parallel_experiment; parallel_experiment.logger.setLevel(logging.WARNING); logger.setLevel(logging.WARNING)
+    >>> class Results:
+    ...     dataFrame = None
+    ...     def add(self, row): self.dataFrame = pandas.concat([self.dataFrame, pandas.DataFrame([row])], ignore_index=True)
+    >>> def single_run(instance_id, copy, time_limit_in_seconds):   # instance i needs i**2 seconds.
+    ...     return {"prop_status": "OK" if instance_id**2 <= time_limit_in_seconds else "TimeOut"}
+    >>> results = Results()
+    >>> run_escalating(results, single_run, {"instance_id": range(12), "copy": [0,1]}, [1,10,100], num_workers=1)
+    >>> results.dataFrame.groupby("time_limit_in_seconds").size().to_dict()
+    {1: 24, 10: 20, 100: 16}
+    >>> run_escalating(results, single_run, {"instance_id": range(12), "copy": [0,1]}, [1,10,100,1000], num_workers=1)
+    >>> results.dataFrame.groupby("time_limit_in_seconds").size().to_dict()
+    {1: 24, 10: 20, 100: 16, 1000: 2}
+    """
+    single_run = functools.partial(run_with_resolved_budget, single_run)
+    is_first_round = True
+    for budget in budgets:
+        round_schedule = functools.partial(_unresolved_inputs, experiment, None if is_first_round else budget, schedule)
+        logger.info("Escalation round with a budget of %s seconds", budget)
+        run_parallel(experiment, single_run, {**input_ranges, "time_limit_in_seconds": [budget]}, num_workers, round_schedule, monitor)
+        is_first_round = False
+
+
+def _unresolved_inputs(experiment:Experiment, budget:float, schedule:Callable[[List[dict]],List[dict]], inputs:List[dict])->List[dict]:
+    """
+    Keep only the inputs that were not resolved with a budget smaller than the given one (all inputs in the first round, where budget is None).
+    """
+    if budget is not None:
+        inputs = [input for input in inputs if _is_unresolved(experiment, input, budget)]
+    return inputs if schedule is None else schedule(inputs)
+
+
+def _is_unresolved(experiment:Experiment, input:dict, budget:float)->bool:
+    """
+    An input is unresolved if none of its rows with a smaller budget is resolved: its latest row timed out, or it has no row at all.
+    An input that was resolved with some budget has no rows with the larger budgets, so only its resolved row decides.
+    """
+    if experiment.dataFrame is None:
+        return True
+    key = {k:normalized(v) for k,v in input.items() if k!="time_limit_in_seconds"}
+    rows = dict_to_rows(experiment.dataFrame, key)
+    return not (rows.loc[rows["time_limit_in_seconds"] < budget, "resolved_budget"] >= 0).any()
+
+
+def time_limit_view(results:pandas.DataFrame, time_limit:float, key_columns:List[str])->pandas.DataFrame:
+    """
+    The rows of an escalating sweep, as if all instances were run with the given time-limit:
+    for each instance, the row of the largest budget that is at most the time-limit.
+    A solver that timed out in this row, but finished within the time-limit in the row of the next budget, is taken from the next row;
+    a solver that did not finish within the time-limit in the next row is marked as timed out at the time-limit.
+    The time_limit_in_seconds column is set to the time-limit, and resolved_budget is recomputed for it.
+
+    :param key_columns: the input columns that identify an instance (all input columns except time_limit_in_seconds).
+
+    >>> results = pandas.DataFrame({"instance_id": [1,2,2,3,3], "time_limit_in_seconds": [1,1,10,1,10],
+    ...     "prop_status": ["OK","TimeOut","OK","TimeOut","OK"], "prop_time_in_seconds": [0.5,1,5,1,8], "resolved_budget": [1,-1,10,-1,10]})
+    >>> time_limit_view(results, 6, ["instance_id"]).drop(columns="time_limit_in_seconds")
+       instance_id prop_status  prop_time_in_seconds  resolved_budget
+    0            1          OK                   0.5                6
+    1            2          OK                   5.0                6
+    3            3     TimeOut                   6.0               -1
+    """
+    solver_names = [column[:-len("_status")] for column in results.columns if column.endswith("_status")]
+    rows = results[results["time_limit_in_seconds"] <= time_limit]
+    view = rows.loc[rows.groupby(key_columns, sort=False)["time_limit_in_seconds"].idxmax()].sort_index()
+    later_rows = results[results["time_limit_in_seconds"] > time_limit]
+    next_rows = later_rows.loc[later_rows.groupby(key_columns, sort=False)["time_limit_in_seconds"].idxmin()]
+    next_rows = view[key_columns].merge(next_rows, on=key_columns, how="left").set_index(view.index)   # NaN for instances with no later row.
+    for solver_name in solver_names:
+        solver_columns = [column for column in results.columns if column.startswith(solver_name+"_")]
+        timed_out = (view[f"{solver_name}_status"]=="TimeOut") & next_rows[f"{solver_name}_status"].notna()
+        finished_in_time = timed_out & (next_rows[f"{solver_name}_status"]!="TimeOut") & (next_rows[f"{solver_name}_time_in_seconds"] <= time_limit)
+        view.loc[finished_in_time, solver_columns] = next_rows.loc[finished_in_time, solver_columns]
+        view.loc[timed_out & ~finished_in_time, f"{solver_name}_time_in_seconds"] = time_limit
+    view["time_limit_in_seconds"] = time_limit
+    resolved = ~(view[[f"{solver_name}_status" for solver_name in solver_names]]=="TimeOut").any(axis=1)
+    view["resolved_budget"] = resolved.map({True: time_limit, False: -1})
+    return view
+
+
+if __name__ == "__main__":
+    if len(sys.argv)<4:
+        print("SYNTAX: python escalation.py <escalating results>.csv <time limit> <output>.csv")
+        sys.exit(1)
+    from columnar_results import read_results
+    results = read_results(sys.argv[1])
+    solver_prefixes = tuple(column[:-len("status")] for column in results.columns if column.endswith("_status"))
+    key_columns = [column for column in results.columns if not column.startswith(solver_prefixes) and column not in ["time_limit_in_seconds", "resolved_budget"]]
+    time_limit_view(results, float(sys.argv[2]), key_columns).to_csv(sys.argv[3], index=False)
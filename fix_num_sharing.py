@@ -1,40 +1,72 @@
-""" 
+"""
 Fix the number of sharings for experiments that timed out.
 The result file should be generated first by `make_results.py`
 
+For every solver with a "<solver>_status" and a "<solver>_num_sharing" column,
+if the solver ran and did not finish OK, its number of sharings is replaced by an upper bound:
+the proven upper bound "<solver>_num_sharing_upper" of an anytime search, if known, or else num_agents-1.
+Rows in which the solver did not run at all (empty status, e.g. maxprod0 in old results),
+and duplicate rows with a known number of sharings, are left as is.
+
 Author: Erel Segal-Halevi
 Since:  2020-2021
 """
 
+import os
 import pandas
 import numpy as np
 
-def fix_num_sharing(results:pandas.DataFrame):
-    def new_prop_num_sharing(row):
-        if row["prop_status"]!="OK":
-            return row["num_agents"]-1
-        else:
-            return row["prop_num_sharing"]
-    def new_ef_num_sharing(row):
-        if row["ef_status"]!="OK":
-            return row["num_agents"]-1
-        else:
-            return row["ef_num_sharing"]
-    def new_ceei_num_sharing(row):
-        if row["maxprod1_status"]!="OK":
-            return row["num_agents"]-1
-        else:
-            return row["maxprod1_num_sharing"]
-    results["prop_num_sharing"] = results.apply(new_prop_num_sharing, axis=1)
-    results["ef_num_sharing"] = results.apply(new_ef_num_sharing, axis=1)
-    results["maxprod1_num_sharing"] = results.apply(new_ceei_num_sharing, axis=1)
+CHUNK_SIZE = 100000   # rows per chunk, when fixing a file.
+
+
+def solver_names(columns)->list:
+    """
+    >>> solver_names(["num_agents", "prop_status", "prop_num_sharing", "maxprod0_status", "maxprod0_num_sharing", "ef_status"])
+    ['prop', 'maxprod0']
+    """
+    return [column[:-len("_status")] for column in columns
+            if column.endswith("_status") and column[:-len("_status")]+"_num_sharing" in columns]
+
+
+def fix_num_sharing(results:pandas.DataFrame)->pandas.DataFrame:
+    """
+    Replace, in place, the number of sharings of every solver run that did not finish OK by its upper bound.
+
+    >>> results = pandas.DataFrame({"num_agents": [3,3,4,4], "prop_status": ["OK","TimeOut","Error",None], "prop_num_sharing": [1,-1,-1,None]})
+    >>> fix_num_sharing(results)["prop_num_sharing"].tolist()
+    [1.0, 2.0, 3.0, nan]
+    >>> results = pandas.DataFrame({"num_agents": [4,4], "prop_status": ["TimeOut","TimeOut"], "prop_num_sharing": [1,-1], "prop_num_sharing_upper": [1,None]})
+    >>> fix_num_sharing(results)["prop_num_sharing"].tolist()
+    [1.0, 3.0]
+    """
+    for solver_name in solver_names(results.columns):
+        upper_bounds = results["num_agents"].to_numpy() - 1
+        if f"{solver_name}_num_sharing_upper" in results.columns:
+            upper_bounds = results[f"{solver_name}_num_sharing_upper"].fillna(pandas.Series(upper_bounds, index=results.index)).to_numpy()
+        status = results[f"{solver_name}_status"].astype(object)
+        num_sharing = results[f"{solver_name}_num_sharing"]
+        known_duplicate = status.str.startswith("Duplicate-of", na=False).to_numpy() & (num_sharing.fillna(-1).to_numpy() >= 0)
+        not_ok = status.notna().to_numpy() & (status.to_numpy() != "OK") & ~known_duplicate
+        results[f"{solver_name}_num_sharing"] = np.where(not_ok, upper_bounds, num_sharing.to_numpy())
+    return results
+
 
+def fix_num_sharing_file(results_file:str, output_file:str=None, chunk_size:int=CHUNK_SIZE):
+    """
+    Fix a results CSV file chunk by chunk, so that the whole file is never loaded into memory.
+    :param output_file: default: overwrite results_file.
+    """
+    output_file = output_file or results_file
+    temporary_file = output_file + ".tmp"
+    header = True
+    for chunk in pandas.read_csv(results_file, chunksize=chunk_size):
+        fix_num_sharing(chunk).to_csv(temporary_file, index=False, header=header, mode="w" if header else "a")
+        header = False
+    os.replace(temporary_file, output_file)
 
 
 
 if __name__ == "__main__":
     folder = "results"
     results_file = folder+"/test.csv"
-    results = pandas.read_csv(results_file)
-    fix_num_sharing(results)
-    results.to_csv(results_file,index=False)
+    fix_num_sharing_file(results_file)
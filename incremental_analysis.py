@@ -0,0 +1,152 @@
+"""
+Incremental analysis: re-running the analysis during a long sweep regenerates only the outputs whose input rows changed.
+
+The state of the previous analysis is kept in a JSON file in the output folder:
+* the number of rows analyzed so far, and a hash of the last one (to detect a results file that was rewritten rather than appended to);
+* for each status table, the running status counts, to which the counts of the new rows are added;
+* for each figure, a fingerprint of the slice of results it depends on: the arguments, the number of rows and the sum of the row hashes.
+Only the new rows are read for updating the state; the whole results file is read only if some figure has to be re-rendered.
+If the results file was rewritten (e.g. by fix_num_sharing.py), or the state file is deleted, everything is regenerated.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import io, json, os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas
+
+from analyze_results import AnalysisSession, status_counts, tables_from_status_counts, write_status_tables, render_figures
+
+import logging, sys
+logger = logging.getLogger(__name__)
+
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.INFO)
+
+STATE_FILENAME = "analysis_state.json"
+
+# For each plot function: the columns it depends on (besides num_agents, num_resources and the solver status), and the suffixes of its output files.
+FIGURE_COLUMNS = {
+    "plot_results_by_agents": lambda column_name: [column_name+"_num_sharing"],
+    "plot_time_by_resources": lambda column_name: [column_name+"_time_in_seconds", column_name+"_num_sharing"],
+    "plot_time_by_agents":    lambda column_name: ["prop_time_in_seconds", "ef_time_in_seconds", "maxprod1_time_in_seconds"],
+    "plot_phases_by_sharing": lambda column_name: [column_name+"_num_sharing", column_name+"_enumeration_seconds", column_name+"_lp_seconds", column_name+"_spawn_seconds", column_name+"_num_graphs"],
+}
+FIGURE_SUFFIXES = {
+    "plot_results_by_agents": [".pdf"],
+    "plot_time_by_resources": ["_maxtime.png", "_medtime.png", "_count.png"],
+    "plot_time_by_agents":    [".pdf"],
+    "plot_phases_by_sharing": ["_phases.png"],
+}
+
+
+def row_hashes(frame:pandas.DataFrame)->np.ndarray:
+    return pandas.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def hash_sum(hashes:np.ndarray)->int:
+    """
+    An order-independent hash of a set of rows, that can be updated by adding the hashes of new rows.
+    """
+    return int(hashes.sum(dtype=np.uint64))   # the sum wraps around modulo 2**64.
+
+
+def figure_slice(session:AnalysisSession, plot_function, column_name:str)->pandas.DataFrame:
+    """
+    The rows and columns of the results that a figure depends on: the completed or timed-out runs of the given solver.
+    """
+    status_column_name = column_name+"_status"
+    columns = ["num_agents", "num_resources", status_column_name, *FIGURE_COLUMNS[plot_function.__name__](column_name)]
+    return session.results.loc[session.ok_or_timeout(status_column_name), columns]
+
+
+def load_state(folder:str, results_file:str)->dict:
+    state_file = os.path.join(folder, STATE_FILENAME)
+    if os.path.isfile(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+        if state["results_file"]==results_file:
+            return state
+    return empty_state(results_file)
+
+
+def empty_state(results_file:str)->dict:
+    return {"results_file": results_file, "num_rows": 0, "last_row_hash": None, "status_counts": {}, "figures": {}}
+
+
+def save_state(folder:str, state:dict):
+    state_file = os.path.join(folder, STATE_FILENAME)
+    with open(state_file+".tmp", "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(state_file+".tmp", state_file)
+
+
+def read_new_rows(results_file:str, state:dict)->Tuple[AnalysisSession, dict]:
+    """
+    Read the rows added since the previous analysis.
+    :return the session of the new rows, and the state (which is reset if the previously analyzed rows have changed).
+    """
+    if state["num_rows"] > 0:
+        new_rows = AnalysisSession(results_file, first_row=state["num_rows"]-1)   # including the last analyzed row, for checking that it did not change.
+        if len(new_rows.results) > 0 and str(row_hashes(new_rows.results.iloc[:1])[0])==state["last_row_hash"]:
+            new_rows.set_results(new_rows.results.iloc[1:].reset_index(drop=True))
+            return (new_rows, state)
+        logger.info("%s was rewritten - regenerating all outputs.", results_file)
+        state = empty_state(results_file)
+    return (AnalysisSession(results_file), state)
+
+
+def update_analysis(folder:str, results_file:str, status_table_outputs:List[Tuple[List[str],Dict[str,str]]], figures:List[tuple], num_workers:int=None)->Tuple[AnalysisSession, AnalysisSession]:
+    """
+    Regenerate the status tables and figures whose input rows changed since the previous analysis.
+
+    :param status_table_outputs: a list of pairs (keys, output_files), as in `analyze_results.print_status_tables`.
+    :param figures: a list of tuples (plot_function, figure_title, column_name, output_file), as in `analyze_results.render_figures`.
+    :return the session of the new rows, and the session of all rows (or None if no figure had to be re-rendered).
+    """
+    state = load_state(folder, results_file)
+    (new_rows, state) = read_new_rows(results_file, state)
+    logger.info("%d new rows since the previous analysis.", len(new_rows.results))
+
+    for (keys, output_files) in status_table_outputs:
+        status_column_names = list(output_files)
+        name = ",".join(keys) + ":" + ",".join(status_column_names)
+        counts = status_counts(new_rows, keys, status_column_names)
+        if name in state["status_counts"]:
+            stored_counts = pandas.read_json(io.StringIO(state["status_counts"][name]), orient="split").set_index(keys)
+            counts = stored_counts.add(counts, fill_value=0).astype(int)
+        elif len(counts) == 0:
+            continue
+        if len(new_rows.results) > 0 or not all(os.path.isfile(output_file) for output_file in output_files.values()):
+            write_status_tables(tables_from_status_counts(counts, keys, status_column_names), output_files)
+        state["status_counts"][name] = counts.reset_index().to_json(orient="split", index=False)
+
+    figures_to_render = []
+    for figure in figures:
+        (plot_function, figure_title, column_name, output_file) = figure
+        name = plot_function.__name__ + ":" + output_file
+        previous = state["figures"].get(name, {"args": None, "num_rows": 0, "hash_sum": 0})
+        slice_hashes = row_hashes(figure_slice(new_rows, plot_function, column_name))
+        fingerprint = {
+            "args": repr((figure_title, column_name)),
+            "num_rows": previous["num_rows"] + len(slice_hashes),
+            "hash_sum": (previous["hash_sum"] + hash_sum(slice_hashes)) % 2**64,
+        }
+        output_files = [output_file+suffix for suffix in FIGURE_SUFFIXES[plot_function.__name__]]
+        if fingerprint != previous or not all(os.path.isfile(file) for file in output_files):
+            figures_to_render.append(figure)
+        state["figures"][name] = fingerprint
+    logger.info("Rendering %d out of %d figures.", len(figures_to_render), len(figures))
+    all_rows = None
+    if figures_to_render:
+        all_rows = AnalysisSession(results_file)
+        render_figures(all_rows, figures_to_render, num_workers)
+
+    if len(new_rows.results) > 0:
+        state["num_rows"] += len(new_rows.results)
+        state["last_row_hash"] = str(row_hashes(new_rows.results.iloc[-1:])[0])
+    save_state(folder, state)
+    return (new_rows, all_rows)
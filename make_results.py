@@ -6,77 +6,87 @@ Since:  2020-2021
 """
 
 from fairpy import ValuationMatrix
-from check_single_instance import product_of_utilities
-
-from fairpy.items.min_sharing_impl.FairAllocationProblem import FairAllocationProblem, ErrorAllocationMatrix
-from fairpy.items.min_sharing_impl.FairEnvyFreeAllocationProblem import FairEnvyFreeAllocationProblem
-from fairpy.items.min_sharing_impl.FairProportionalAllocationProblem import FairProportionalAllocationProblem
-from fairpy.items.min_sharing_impl.FairMaxProductAllocationProblem import FairMaxProductAllocationProblem
+from solvers import solve_all, solutions_to_row, print_solutions
+from min_sharing_search import to_array
+from reduction import InstanceReduction
 
 from spliddit import spliddit_instance, spliddit_instances_ids
 
-def solve_single_instance(instance_id, time_limit_in_seconds=998):
+from result_store import RESULT_STORE_FILE   # results of previous runs, reused when the same instance is solved again.
+
+def solve_single_instance(instance_id, time_limit_in_seconds=998, concurrent_solvers=False, result_store=RESULT_STORE_FILE, quiet=False, profile=False, anytime=False, reduce=False,
+        min_sharing_search=False, all_levels=False):
+    """
+    :param quiet: if True, the valuation matrix and the allocations are not printed.
+    :param profile: if True, per-phase timing columns are added for each solver (see min_sharing_search.PROFILE_FIELDS).
+    :param anytime: if True, the solvers run in anytime mode: a timed-out solver returns its best allocation,
+                    and the columns <solver>_num_sharing_lower and <solver>_num_sharing_upper are added.
+    :param reduce: if True, the solvers search a reduced instance, and the reduction statistics are added as columns (see reduction.py).
+    :param min_sharing_search, all_levels: see `solvers.solve`. profile, anytime and reduce require min_sharing_search=True.
+    """
     valuation_matrix = spliddit_instance(instance_id)
     valuation_matrix = ValuationMatrix(valuation_matrix)
-    print("\nInstance: ", instance_id, "\nValuations: \n", valuation_matrix)
-    print("{} agents, {} resources".format(valuation_matrix.num_of_agents, valuation_matrix.num_of_objects), flush=True)
-
-    # prev_valuation_matrix is a static variable: https://stackoverflow.com/a/279597/827927
-    if hasattr(solve_single_instance,"prev_valuation_matrix") and valuation_matrix.equals(solve_single_instance.prev_valuation_matrix):
-        prop_time_in_seconds = ef_time_in_seconds = maxprod1_time_in_seconds = -1
-        prop_status = ef_status = maxprod1_status = "Duplicate"
-        prop_allocation = ef_allocation = maxprod1_allocation = ErrorAllocationMatrix()
-    else:
-        problem = FairProportionalAllocationProblem(valuation_matrix)
-        (prop_status, prop_time_in_seconds, prop_allocation) = \
-            problem.find_min_sharing_allocation_with_time_limit(time_limit_in_seconds=time_limit_in_seconds)
-        prop_product = product_of_utilities(prop_allocation,valuation_matrix)
+    if not quiet:
+        print("\nInstance: ", instance_id, "\nValuations: \n", valuation_matrix)
+        print("{} agents, {} resources".format(valuation_matrix.num_of_agents, valuation_matrix.num_of_objects), flush=True)
 
-        problem = FairEnvyFreeAllocationProblem(valuation_matrix)
-        (ef_status, ef_time_in_seconds, ef_allocation) = \
-            problem.find_min_sharing_allocation_with_time_limit(time_limit_in_seconds=time_limit_in_seconds)
-        ef_product = product_of_utilities(ef_allocation,valuation_matrix)
-
-        TOLERANCE = 0.001
-        problem = FairMaxProductAllocationProblem(valuation_matrix, tolerance=TOLERANCE)
-        (maxprod1_status, maxprod1_time_in_seconds, maxprod1_allocation) = \
-            problem.find_min_sharing_allocation_with_time_limit(time_limit_in_seconds=time_limit_in_seconds)
-        maxprod1_product = product_of_utilities(maxprod1_allocation,valuation_matrix)
-
-    print("\nProportional Allocation: \n", prop_allocation)
-    print("Status: {}, #sharing: {}, product: {}, time: {}".format(prop_status, prop_allocation.num_of_sharings(), prop_product, prop_time_in_seconds))
-    print("\nEnvy-Free Allocation: \n", ef_allocation)
-    print("Status: {}, #sharing: {}, product: {}, time: {}".format(ef_status, ef_allocation.num_of_sharings(), ef_product, ef_time_in_seconds))
-    print(f"\n{TOLERANCE}-Max-product Allocation: \n", maxprod1_allocation)
-    print("Status: {}, #sharing: {}, product: {}, time: {}".format(maxprod1_status, maxprod1_allocation.num_of_sharings(), maxprod1_product, maxprod1_time_in_seconds))
-    print(flush=True)
-
-    solve_single_instance.prev_valuation_matrix = valuation_matrix
+    profiles = {} if profile else None
+    sharing_bounds = {} if anytime else None
+    solutions = solve_all(valuation_matrix, time_limit_in_seconds, concurrent=concurrent_solvers, result_store=result_store, profiles=profiles, sharing_bounds=sharing_bounds, reduce=reduce,
+        min_sharing_search=min_sharing_search, all_levels=all_levels)
+    row = solutions_to_row(solutions, valuation_matrix, profiles, sharing_bounds)
+    if reduce:
+        row.update(InstanceReduction(to_array(valuation_matrix, valuation_matrix.num_of_agents)).stats())
+    if not quiet:
+        print_solutions(solutions, row)
 
     return {
         "num_agents": valuation_matrix.num_of_agents,
         "num_resources": valuation_matrix.num_of_objects,
-        "prop_status": prop_status,
-        "prop_time_in_seconds": prop_time_in_seconds,
-        "prop_num_sharing": prop_allocation.num_of_sharings(),
-        "prop_product": prop_product,
-        "ef_status": ef_status,
-        "ef_time_in_seconds": ef_time_in_seconds,
-        "ef_num_sharing": ef_allocation.num_of_sharings(),
-        "ef_product": ef_product,
-        "maxprod1_status": maxprod1_status,
-        "maxprod1_time_in_seconds": maxprod1_time_in_seconds,
-        "maxprod1_num_sharing": maxprod1_allocation.num_of_sharings(),
-        "maxprod1_product": maxprod1_product,
+        **row,
     }
 
 
 if __name__ == "__main__":
-    import logging, experiments_csv
-    experiment = experiments_csv.Experiment("results/", "99sec.csv", "results/backups/")
+    import logging, os, functools
+    from columnar_results import make_experiment, is_columnar
+    from parallel_experiment import run_parallel
+    from escalation import run_escalating, escalating_budgets
+    from schedule import runtime_schedule
+    from progress import ProgressMonitor
+    from spliddit import spliddit_instance_shape
+    from duplicates import build_hash_index, map_duplicates_to_representatives, add_duplicate_rows
+    num_workers = os.cpu_count()   # set to 1 to run the instances one after the other, in the current process.
+    budget_in_seconds = None       # set to a number to run only the cheapest instances whose predicted total run-time fits in the budget.
+    concurrent_solvers = False     # set to True to run the three solvers of each instance in parallel processes.
+    profile = False                # set to True to add per-phase timing columns (enumeration, LP, #graphs, spawn) for each solver.
+    reduce_instances = False       # set to True to drop null resources and skip symmetric consumption graphs, with reduction-statistics columns. Use a new results file when changing it.
+    anytime = False                # set to True to keep the best allocation of timed-out solvers, with lower/upper #sharing columns. Use a new results file when changing it.
+    min_sharing_search = False     # set to True to search with min_sharing_search.py instead of fairpy (required by profile, reduce_instances and anytime; check it first with check_min_sharing_search.py).
+    all_levels = False             # with min_sharing_search, set to True to search beyond n-1 sharings, for instances where fairpy misses the allocation for numerical reasons.
+    quiet = False                  # set to True to stop printing the valuations and allocations of each instance (progress is in results/progress.json).
+    escalating = False             # set to True to solve with time-limits of 1, 10, 100... seconds up to the time-limit, re-running only the instances that timed out (see escalation.py).
+    results_filename = "99sec.csv"  # or "99sec.parquet", for a columnar results folder (see columnar_results.py).
+    experiment = make_experiment("results/", results_filename, "results/backups/")
     experiment.logger.setLevel(logging.INFO)
+    instance_ids = spliddit_instances_ids(first_id=203)
+    # Instances equivalent to an earlier instance (up to permutations and scaling) are not solved - their rows are copied.
+    hash_index = build_hash_index(instance_ids, spliddit_instance, "results/instance_hashes.csv")
+    duplicates = map_duplicates_to_representatives(hash_index)
     input_ranges = {
-        "instance_id": spliddit_instances_ids(first_id=203), 
+        "instance_id": [instance_id for instance_id in instance_ids if instance_id not in duplicates],
         "time_limit_in_seconds": [99]
     }
-    experiment.run(solve_single_instance, input_ranges)
+    schedule = runtime_schedule(["results/999sec.csv", "results/"+results_filename], shape_of=lambda input: spliddit_instance_shape(input["instance_id"]), budget_in_seconds=budget_in_seconds)
+    monitor = ProgressMonitor("results/progress.json", schedule.predict)
+    single_run = functools.partial(solve_single_instance, concurrent_solvers=concurrent_solvers, quiet=quiet, profile=profile, anytime=anytime, reduce=reduce_instances,
+        min_sharing_search=min_sharing_search, all_levels=all_levels)
+    if escalating:
+        budgets = escalating_budgets(cap=input_ranges.pop("time_limit_in_seconds")[0])
+        run_escalating(experiment, single_run, input_ranges, budgets, num_workers, schedule, monitor)
+        input_ranges["time_limit_in_seconds"] = budgets
+    else:
+        run_parallel(experiment, single_run, input_ranges, num_workers, schedule, monitor)
+    add_duplicate_rows(experiment, duplicates, hash_index, input_ranges)
+    if is_columnar(results_filename):
+        experiment.compact()
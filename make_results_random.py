@@ -6,78 +6,96 @@ Since:  2020-2021
 """
 
 from fairpy import ValuationMatrix
-from check_single_instance import product_of_utilities
+from solvers import solve_all, solutions_to_row, print_solutions
+from min_sharing_search import to_array
+from reduction import InstanceReduction
 
-from fairpy.items.min_sharing_impl.FairEnvyFreeAllocationProblem import FairEnvyFreeAllocationProblem
-from fairpy.items.min_sharing_impl.FairProportionalAllocationProblem import FairProportionalAllocationProblem
-from fairpy.items.min_sharing_impl.FairMaxProductAllocationProblem import FairMaxProductAllocationProblem
+from random_instances import random_valuation, BASE_SEED
 
-import numpy as np
+RESULT_STORE_FILE = "results_random/solver_results.db"   # results of previous runs, reused when the same instance is solved again (see result_store.py).
 
-def solve_random_instance(instance_id:int, num_agents:int, num_resources:int, time_limit_in_seconds=998):
-    valuation_matrix = np.random.rand(num_agents, num_resources)
+def solve_random_instance(instance_id:int, num_agents:int, num_resources:int, time_limit_in_seconds=998, concurrent_solvers=False, result_store=RESULT_STORE_FILE, quiet=False, profile=False, anytime=False, reduce=False,
+        min_sharing_search=False, all_levels=False, distribution="uniform", base_seed=BASE_SEED):
+    """
+    :param distribution, base_seed: the instance is generated by `random_instances.random_valuation`, so the same inputs always give the same instance.
+    :param quiet: if True, the valuation matrix and the allocations are not printed.
+    :param profile: if True, per-phase timing columns are added for each solver (see min_sharing_search.PROFILE_FIELDS).
+    :param anytime: if True, the solvers run in anytime mode: a timed-out solver returns its best allocation,
+                    and the columns <solver>_num_sharing_lower and <solver>_num_sharing_upper are added.
+    :param reduce: if True, the solvers search a reduced instance, and the reduction statistics are added as columns (see reduction.py).
+    :param min_sharing_search, all_levels: see `solvers.solve`. profile, anytime and reduce require min_sharing_search=True.
+    """
+    valuation_matrix = random_valuation(instance_id, num_agents, num_resources, distribution, base_seed)
     valuation_matrix = ValuationMatrix(valuation_matrix)
-    print("\nInstance: ", instance_id, "\nValuations: \n", valuation_matrix)
-    print("{} agents, {} resources".format(valuation_matrix.num_of_agents, valuation_matrix.num_of_objects), flush=True)
+    if not quiet:
+        print("\nInstance: ", instance_id, "\nValuations: \n", valuation_matrix)
+        print("{} agents, {} resources".format(valuation_matrix.num_of_agents, valuation_matrix.num_of_objects), flush=True)
 
-    problem = FairProportionalAllocationProblem(valuation_matrix)
-    (prop_status, prop_time_in_seconds, prop_allocation) = \
-        problem.find_min_sharing_allocation_with_time_limit(time_limit_in_seconds=time_limit_in_seconds)
-    prop_product = product_of_utilities(prop_allocation,valuation_matrix)
-
-    problem = FairEnvyFreeAllocationProblem(valuation_matrix)
-    (ef_status, ef_time_in_seconds, ef_allocation) = \
-        problem.find_min_sharing_allocation_with_time_limit(time_limit_in_seconds=time_limit_in_seconds)
-    ef_product = product_of_utilities(ef_allocation,valuation_matrix)
-
-    TOLERANCE = 0.001
-    problem = FairMaxProductAllocationProblem(valuation_matrix, tolerance=TOLERANCE)
-    (maxprod1_status, maxprod1_time_in_seconds, maxprod1_allocation) = \
-        problem.find_min_sharing_allocation_with_time_limit(time_limit_in_seconds=time_limit_in_seconds)
-    maxprod1_product = product_of_utilities(maxprod1_allocation,valuation_matrix)
-
-    print("\nProportional Allocation: \n", prop_allocation)
-    print("Status: {}, #sharing: {}, product: {}, time: {}".format(prop_status, prop_allocation.num_of_sharings(), prop_product, prop_time_in_seconds))
-    print("\nEnvy-Free Allocation: \n", ef_allocation)
-    print("Status: {}, #sharing: {}, product: {}, time: {}".format(ef_status, ef_allocation.num_of_sharings(), ef_product, ef_time_in_seconds))
-    print(f"\n{TOLERANCE}-Max-product Allocation: \n", maxprod1_allocation)
-    print("Status: {}, #sharing: {}, product: {}, time: {}".format(maxprod1_status, maxprod1_allocation.num_of_sharings(), maxprod1_product, maxprod1_time_in_seconds))
-    print(flush=True)
-
-    return {
-        "prop_status": prop_status,
-        "prop_time_in_seconds": prop_time_in_seconds,
-        "prop_num_sharing": prop_allocation.num_of_sharings(),
-        "prop_product": prop_product,
-        "ef_status": ef_status,
-        "ef_time_in_seconds": ef_time_in_seconds,
-        "ef_num_sharing": ef_allocation.num_of_sharings(),
-        "ef_product": ef_product,
-        "maxprod1_status": maxprod1_status,
-        "maxprod1_time_in_seconds": maxprod1_time_in_seconds,
-        "maxprod1_num_sharing": maxprod1_allocation.num_of_sharings(),
-        "maxprod1_product": maxprod1_product,
-    }
+    profiles = {} if profile else None
+    sharing_bounds = {} if anytime else None
+    solutions = solve_all(valuation_matrix, time_limit_in_seconds, concurrent=concurrent_solvers, result_store=result_store, profiles=profiles, sharing_bounds=sharing_bounds, reduce=reduce,
+        min_sharing_search=min_sharing_search, all_levels=all_levels)
+    row = solutions_to_row(solutions, valuation_matrix, profiles, sharing_bounds)
+    if reduce:
+        row.update(InstanceReduction(to_array(valuation_matrix, valuation_matrix.num_of_agents)).stats())
+    if not quiet:
+        print_solutions(solutions, row)
+    return row
 
 
 
 if __name__ == "__main__":
-    import logging, experiments_csv
+    import logging, os, functools, experiments_csv
+    from columnar_results import make_experiment, is_columnar
+    from parallel_experiment import run_parallel
+    from escalation import run_escalating, escalating_budgets
+    from schedule import runtime_schedule
+    from progress import ProgressMonitor
+    num_workers = os.cpu_count()   # set to 1 to run the instances one after the other, in the current process.
+    budget_in_seconds = None       # set to a number to run only the cheapest instances whose predicted total run-time fits in the budget.
+    concurrent_solvers = False     # set to True to run the three solvers of each instance in parallel processes.
+    distribution = "uniform"       # "uniform", "spliddit", "correlated" or "sparse" (see random_instances.py).
+    base_seed = BASE_SEED          # the seed from which the instances are generated (see random_instances.py).
+    profile = False                # set to True to add per-phase timing columns (enumeration, LP, #graphs, spawn) for each solver.
+    reduce_instances = False       # set to True to drop null resources and skip symmetric consumption graphs, with reduction-statistics columns. Use a new results file when changing it.
+    anytime = False                # set to True to keep the best allocation of timed-out solvers, with lower/upper #sharing columns. Use a new results file when changing it.
+    min_sharing_search = False     # set to True to search with min_sharing_search.py instead of fairpy (required by profile, reduce_instances and anytime; check it first with check_min_sharing_search.py).
+    all_levels = False             # with min_sharing_search, set to True to search beyond n-1 sharings, for instances where fairpy misses the allocation for numerical reasons.
+    quiet = False                  # set to True to stop printing the valuations and allocations of each instance (progress is in results_random/progress.json).
+    escalating = False             # set to True to solve with time-limits of 1, 10, 100... seconds up to the time-limit, re-running only the instances that timed out (see escalation.py).
     experiments_csv.logger.setLevel(logging.INFO)
-    experiment = experiments_csv.Experiment("results_random/", "99sec.csv", "results_random/backups/")
+    results_filename = f"99sec_{distribution}.csv"  # or ".parquet", for a columnar results folder (see columnar_results.py). Old files without the distribution and base_seed columns (e.g. 99sec.csv) cannot be resumed.
+    experiment = make_experiment("results_random/", results_filename, "results_random/backups/")
+    schedule = runtime_schedule(["results_random/"+results_filename], budget_in_seconds=budget_in_seconds)
+    monitor = ProgressMonitor("results_random/progress.json", schedule.predict)
+    single_run = functools.partial(solve_random_instance, concurrent_solvers=concurrent_solvers, quiet=quiet, profile=profile, anytime=anytime, reduce=reduce_instances,
+        min_sharing_search=min_sharing_search, all_levels=all_levels)
+
+    def run_sweep(input_ranges:dict):
+        if escalating:
+            budgets = escalating_budgets(cap=input_ranges.pop("time_limit_in_seconds")[0])
+            run_escalating(experiment, single_run, input_ranges, budgets, num_workers, schedule, monitor)
+        else:
+            run_parallel(experiment, single_run, input_ranges, num_workers, schedule, monitor)
     
     input_ranges = {
         "instance_id": range(20),
         "num_agents": [2,3],
         "num_resources": [2,4,6,8],
+        "distribution": [distribution],
+        "base_seed": [base_seed],
         "time_limit_in_seconds": [99]
     }
-    experiment.run(solve_random_instance, input_ranges)
+    run_sweep(input_ranges)
 
     input_ranges = {
         "instance_id": range(20),
         "num_agents": [4],
         "num_resources": [2,4,6],
+        "distribution": [distribution],
+        "base_seed": [base_seed],
         "time_limit_in_seconds": [99]
     }
-    experiment.run(solve_random_instance, input_ranges)
+    run_sweep(input_ranges)
+    if is_columnar(results_filename):
+        experiment.compact()
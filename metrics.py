@@ -0,0 +1,140 @@
+"""
+Batched welfare and fairness metrics of allocations.
+
+All metrics are computed at once for a stack of instances: valuations and allocations are arrays of shape (k, n, m),
+where allocations[i,a,r] is the fraction of resource r given to agent a in the i-th allocation.
+Instances with fewer agents or resources are padded with zeros; pass num_agents so that the padded agents are ignored.
+A failed allocation is represented by a matrix of NaN values; its metrics are NaN, and its number of sharings is -1.
+
+The Nash welfare is reported as a sum of logarithms, which does not overflow even when the product of utilities does.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas
+
+from result_store import open_result_store, result_key, blob_to_array
+
+SHARING_THRESHOLD = 1e-9   # a fraction above this counts as a share of the resource.
+METRIC_NAMES = ["log_nash_welfare", "min_utility", "max_envy", "min_prop_gap", "num_sharing"]
+
+
+def stack_padded(matrices:List[np.ndarray], fill_value:float=0.0)->np.ndarray:
+    """
+    Stack matrices of different shapes into a single (k, max rows, max columns) array.
+
+    >>> stack_padded([np.ones((1,2)), np.ones((2,1))])
+    array([[[1., 1.],
+            [0., 0.]],
+    <BLANKLINE>
+           [[1., 0.],
+            [1., 0.]]])
+    """
+    num_rows = max(matrix.shape[0] for matrix in matrices)
+    num_columns = max(matrix.shape[1] for matrix in matrices)
+    stack = np.full((len(matrices), num_rows, num_columns), fill_value, dtype=float)
+    for (index, matrix) in enumerate(matrices):
+        stack[index, :matrix.shape[0], :matrix.shape[1]] = matrix
+    return stack
+
+
+def batch_metrics(valuations:np.ndarray, allocations:np.ndarray, num_agents:np.ndarray=None)->Dict[str,np.ndarray]:
+    """
+    :param valuations, allocations: arrays of shape (k, n, m).
+    :param num_agents: the number of real (non-padded) agents in each instance. Default: n for all instances.
+    :return a dict with:
+        utilities (k,n): the utility of each agent (NaN for padded agents);
+        log_nash_welfare (k): the sum of the logarithms of the utilities (-inf if some agent gets nothing);
+        min_utility (k): the egalitarian welfare;
+        max_envy (k): the maximum, over pairs of agents, of the value an agent assigns to the other's bundle minus to its own bundle (0 if envy-free);
+        min_prop_gap (k): the minimum, over agents, of (utility - total value / num agents) / total value (non-negative iff proportional);
+        num_sharing (k): the number of resources shares beyond the first, summed over resources.
+
+    >>> valuations = np.array([[[3.,1.],[1.,3.]], [[3.,1.],[1.,3.]]])
+    >>> allocations = np.array([[[1.,0.],[0.,1.]], [[0.5,0.5],[0.5,0.5]]])
+    >>> metrics = batch_metrics(valuations, allocations)
+    >>> np.exp(metrics["log_nash_welfare"]), metrics["min_utility"], metrics["max_envy"], metrics["min_prop_gap"], metrics["num_sharing"]
+    (array([9., 4.]), array([3., 2.]), array([0., 0.]), array([0.25, 0.  ]), array([0, 2]))
+    """
+    valuations = np.asarray(valuations, dtype=float)
+    allocations = np.asarray(allocations, dtype=float)
+    (k, n, _) = valuations.shape
+    num_agents = np.full(k, n) if num_agents is None else np.asarray(num_agents)
+    real_agents = np.arange(n)[None,:] < num_agents[:,None]                     # (k,n)
+    failed = np.isnan(allocations).any(axis=(1,2))                               # (k)
+    allocations = np.nan_to_num(allocations)
+
+    values_of_bundles = np.einsum("kar,kbr->kab", valuations, allocations)       # [i,a,b] = the value of agent a for the bundle of agent b.
+    utilities = np.diagonal(values_of_bundles, axis1=1, axis2=2).copy()          # (k,n)
+    utilities[~real_agents] = np.nan
+    with np.errstate(divide="ignore"):
+        log_nash_welfare = np.where(real_agents, np.log(np.where(real_agents, utilities, 1)), 0).sum(axis=1)
+    min_utility = np.nanmin(utilities, axis=1)
+
+    envy = values_of_bundles - utilities[:,:,None]
+    real_pairs = real_agents[:,:,None] & real_agents[:,None,:]
+    max_envy = np.maximum(np.where(real_pairs, envy, -np.inf).max(axis=(1,2)), 0)
+
+    total_values = valuations.sum(axis=2)                                        # (k,n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prop_gaps = (utilities - total_values/num_agents[:,None]) / total_values
+    min_prop_gap = np.nanmin(np.where(real_agents, prop_gaps, np.nan), axis=1)
+
+    num_owners = (allocations > SHARING_THRESHOLD).sum(axis=1)                   # (k,m)
+    num_sharing = np.maximum(num_owners-1, 0).sum(axis=1)
+
+    for metric in [log_nash_welfare, min_utility, max_envy, min_prop_gap]:
+        metric[failed] = np.nan
+    utilities[failed] = np.nan
+    num_sharing[failed] = -1
+    return {"utilities": utilities, "log_nash_welfare": log_nash_welfare, "min_utility": min_utility,
+            "max_envy": max_envy, "min_prop_gap": min_prop_gap, "num_sharing": num_sharing}
+
+
+def product_of_utilities(valuations:np.ndarray, allocations:np.ndarray, num_agents:np.ndarray=None)->np.ndarray:
+    """
+    The product of utilities (as in the <solver>_product result columns): exp of the log Nash welfare, or 0 for a failed allocation.
+
+    >>> product_of_utilities(np.array([[[3.,1.],[1.,3.]]]*2), np.array([[[1.,0.],[0.,1.]], [[np.nan]*2]*2]))
+    array([9., 0.])
+    """
+    log_nash_welfare = batch_metrics(valuations, allocations, num_agents)["log_nash_welfare"]
+    return np.where(np.isnan(log_nash_welfare), 0, np.exp(log_nash_welfare))
+
+
+def metrics_from_result_store(store_file:str, valuation_matrices:Dict[int,np.ndarray], solver_names:List[str], tolerances:Dict[str,float]=None)->pandas.DataFrame:
+    """
+    Recompute the metrics of stored allocations, without solving again.
+
+    :param valuation_matrices: maps each instance id to its valuation matrix.
+    :param tolerances: the tolerance of each solver whose results are keyed by a tolerance (the max-product solvers).
+                       Default: `solvers.TOLERANCE`, as used by the experiment drivers.
+    :return a DataFrame with a row per instance id, and a column <solver>_<metric> for each solver and metric.
+            Instances whose allocation is not in the store (or did not finish OK) get NaN metrics and -1 sharings.
+    """
+    instance_ids = list(valuation_matrices)
+    valuations = stack_padded([np.asarray(valuation_matrices[instance_id], dtype=float) for instance_id in instance_ids])
+    num_agents = np.array([np.shape(valuation_matrices[instance_id])[0] for instance_id in instance_ids])
+    from solvers import TOLERANCE   # not imported at the top, since solvers imports this module.
+    tolerances = tolerances or {}
+    connection = open_result_store(store_file)
+    columns = {"instance_id": instance_ids}
+    for solver_name in solver_names:
+        tolerance = tolerances.get(solver_name, TOLERANCE)
+        allocations = np.full(valuations.shape, np.nan)
+        for (index, instance_id) in enumerate(instance_ids):
+            key = result_key(np.asarray(valuation_matrices[instance_id]), solver_name, tolerance)
+            rows = connection.execute("select allocation from results where matrix_hash=? and solver_name=? and tolerance=? and status='OK'", key).fetchall()
+            if rows:
+                allocation = blob_to_array(rows[0][0])
+                allocations[index] = 0
+                allocations[index, :allocation.shape[0], :allocation.shape[1]] = allocation
+        metrics = batch_metrics(valuations, allocations, num_agents)
+        for metric_name in METRIC_NAMES:
+            columns[f"{solver_name}_{metric_name}"] = metrics[metric_name]
+    connection.close()
+    return pandas.DataFrame(columns)
@@ -0,0 +1,363 @@
+"""
+A driver for the min-sharing search of the fairpy `Fair*AllocationProblem` classes,
+that can start the search from a known lower bound on the number of sharings,
+and stop it at a known feasible allocation (an upper bound).
+
+The search mirrors `FairAllocationProblem.find_allocation_with_min_sharing`:
+for num_of_sharing = 0,1,2,..., it enumerates the consumption graphs with at most num_of_sharing sharings,
+and asks the problem to find a fair allocation for each graph. Here, the levels below the lower bound are skipped,
+graphs already tried in a previous level are not re-solved, and the search stops one level below the upper bound.
+
+In anytime mode, the search first computes a cheap suitable allocation - the max-Nash-welfare allocation,
+which is proportional, envy-free and max-product, and usually has at most n-1 sharings - as an upper bound,
+and raises the lower bound after each level it exhausts. On timeout, it returns the best allocation found with the proven bounds.
+
+The time limit is checked cooperatively: the search checks the deadline before every solver call, and stops by itself.
+Every search runs in a long-lived worker process (not only the solver calls that cannot be interrupted), that is reused by all searches
+of the current process; the worker is killed (and restarted) only when a single uninterruptible solver call overruns the deadline.
+A search that finishes after the deadline is reported as a TimeOut.
+
+Optionally, the search is profiled: the time spent enumerating consumption graphs, the time spent in the solver calls
+for the graphs (the LP / convex programs), the number of graphs tried, and the overhead of dispatching the search to the worker.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import multiprocessing, os
+from time import perf_counter, sleep
+from typing import Callable, Tuple
+
+import numpy as np
+
+from fairpy.allocations import AllocationMatrix
+from fairpy.items.min_sharing_impl.FairAllocationProblem import FairAllocationProblem, ErrorAllocationMatrix
+from fairpy.items.min_sharing_impl.FairEnvyFreeAllocationProblem import FairEnvyFreeAllocationProblem
+from fairpy.items.min_sharing_impl.FairProportionalAllocationProblem import FairProportionalAllocationProblem
+from fairpy.items.min_sharing_impl.FairMaxProductAllocationProblem import FairMaxProductAllocationProblem
+
+from reduction import Symmetry, canonical_graph_key
+
+NUM_OF_DECIMAL_DIGITS = 3
+
+Solution = Tuple[str, float, AllocationMatrix]   # (status, time_in_seconds, allocation), as returned by find_min_sharing_allocation_with_time_limit.
+
+PROFILE_FIELDS = ["enumeration_seconds", "lp_seconds", "num_graphs", "spawn_seconds", "num_skipped_graphs"]
+(ENUMERATION, LP, NUM_GRAPHS, SPAWN, SKIPPED_GRAPHS) = range(len(PROFILE_FIELDS))
+
+
+def to_array(matrix, num_of_rows:int)->np.ndarray:
+    """
+    Convert a fairpy ValuationMatrix or AllocationMatrix (whose rows are the agents) into a numpy array.
+    """
+    return np.array([matrix[row] for row in range(num_of_rows)], dtype=float)
+
+
+def find_min_sharing_allocation(problem:FairAllocationProblem, min_num_of_sharing:int=0, max_num_of_sharing:int=None, profile=None,
+        report_lower_bound:Callable[[int],None]=None, deadline:float=None, symmetry:Symmetry=None)->AllocationMatrix:
+    """
+    :param min_num_of_sharing: a lower bound: it is known that there is no suitable allocation with fewer sharings.
+    :param max_num_of_sharing: the highest level to search. Default: n-1, as in fairpy (see `max_possible_sharing`).
+    :param profile: an optional array indexed by PROFILE_FIELDS, to which the enumeration time, solver time and number of graphs are added.
+    :param report_lower_bound: an optional function, called with the new lower bound whenever a level is exhausted.
+    :param deadline: an optional perf_counter time; once it has passed, TimeoutError is raised before the next solver call.
+    :param symmetry: optional groups of symmetric resources and agents (see `reduction.InstanceReduction`);
+                     a graph equivalent to a graph already tried is skipped (and counted in profile[SKIPPED_GRAPHS]).
+    :return a suitable allocation with the minimum number of sharings in the given range, or None if there is none.
+    """
+    if max_num_of_sharing is None:
+        max_num_of_sharing = max_possible_sharing(problem)
+    tried_graph_keys = set()
+    for num_of_sharing in range(min_num_of_sharing, max_num_of_sharing+1):
+        problem.graph_generator.set_maximum_number_of_sharing(num_of_sharing)
+        consumption_graphs = problem.graph_generator.generate_all_consumption_graph()
+        if profile is not None:
+            consumption_graphs = _timed(consumption_graphs, profile)
+        for consumption_graph in consumption_graphs:
+            if consumption_graph.get_num_of_sharing() < num_of_sharing:
+                continue   # already tried in a previous level, or below the lower bound.
+            if symmetry is not None:
+                graph_key = canonical_graph_key(consumption_graph.get_graph(), symmetry)
+                if graph_key in tried_graph_keys:
+                    if profile is not None:
+                        profile[SKIPPED_GRAPHS] += 1
+                    continue
+                tried_graph_keys.add(graph_key)
+            start = perf_counter()
+            if deadline is not None and start >= deadline:
+                raise TimeoutError()
+            problem.find_allocation_for_graph(consumption_graph)
+            if profile is not None:
+                profile[LP] += perf_counter()-start
+                profile[NUM_GRAPHS] += 1
+            if problem.find:
+                return AllocationMatrix(problem.min_sharing_allocation).round(NUM_OF_DECIMAL_DIGITS)
+        if report_lower_bound is not None:
+            report_lower_bound(num_of_sharing+1)
+    return None
+
+
+def max_possible_sharing(problem:FairAllocationProblem, all_levels:bool=False)->int:
+    """
+    The highest level of the search.
+    :param all_levels: if False, n-1, as in fairpy: in theory, every instance has a suitable allocation with at most n-1 sharings.
+                       If True, the number of sharings when every resource is shared by all agents,
+                       since the fairpy solvers may miss the allocation with n-1 sharings for numerical reasons, and find one only at a higher level.
+    """
+    num_of_agents = problem.valuation.num_of_agents
+    return (num_of_agents - 1) * problem.valuation.num_of_objects if all_levels else num_of_agents - 1
+
+
+def _timed(iterable, profile):
+    """
+    Yield the items of the iterable, adding the time spent producing them to profile[ENUMERATION].
+    """
+    iterator = iter(iterable)
+    while True:
+        start = perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            profile[ENUMERATION] += perf_counter()-start
+        yield item
+
+
+def max_nash_welfare_allocation(valuations:np.ndarray)->np.ndarray:
+    """
+    Solve the Eisenberg-Gale program: maximize the sum of logarithms of the utilities of the agents with a positive value.
+    Resources that no agent values are given to the first agent; agents that value nothing get nothing.
+    :return the allocation rounded to NUM_OF_DECIMAL_DIGITS, or None if the convex solver failed.
+    """
+    import cvxpy   # a dependency of fairpy, used only in anytime mode.
+    (agents, resources) = (valuations.sum(axis=1) > 0, valuations.sum(axis=0) > 0)
+    allocation = np.zeros(valuations.shape)
+    allocation[0, ~resources] = 1
+    if agents.any() and resources.any():
+        values = valuations[np.ix_(agents, resources)]
+        fractions = cvxpy.Variable(values.shape, nonneg=True)
+        utilities = cvxpy.sum(cvxpy.multiply(values, fractions), axis=1)
+        try:
+            cvxpy.Problem(cvxpy.Maximize(cvxpy.sum(cvxpy.log(utilities))), [cvxpy.sum(fractions, axis=0) == 1]).solve()
+        except cvxpy.error.SolverError:
+            return None
+        if fractions.value is None:
+            return None
+        allocation[np.ix_(agents, resources)] = fractions.value
+    return allocation.round(NUM_OF_DECIMAL_DIGITS) + 0.0
+
+
+def is_suitable(problem:FairAllocationProblem, valuations:np.ndarray, allocation:np.ndarray)->bool:
+    """
+    Check that an allocation, rounded to NUM_OF_DECIMAL_DIGITS, is suitable for the given problem, up to the rounding error.
+    A max-Nash-welfare allocation is suitable for the max-product problem by definition.
+
+    >>> from fairpy import ValuationMatrix
+    >>> valuations = np.array([[3.,1.],[1.,3.]])
+    >>> is_suitable(FairEnvyFreeAllocationProblem(ValuationMatrix(valuations)), valuations, np.array([[1.,0.],[0.,1.]]))
+    True
+    >>> is_suitable(FairProportionalAllocationProblem(ValuationMatrix(valuations)), valuations, np.array([[0.,1.],[1.,0.]]))
+    False
+    """
+    values_of_bundles = valuations @ allocation.T   # [i,j] = the value of agent i for the bundle of agent j.
+    utilities = values_of_bundles.diagonal()
+    tolerance = 10**-NUM_OF_DECIMAL_DIGITS * valuations.sum(axis=1)
+    if isinstance(problem, FairEnvyFreeAllocationProblem):
+        return bool(np.all(utilities[:,None] >= values_of_bundles - tolerance[:,None]))
+    if isinstance(problem, FairProportionalAllocationProblem):
+        return bool(np.all(utilities >= valuations.sum(axis=1)/len(valuations) - tolerance))
+    return isinstance(problem, FairMaxProductAllocationProblem)
+
+
+def upper_bound_allocation(problem:FairAllocationProblem)->AllocationMatrix:
+    """
+    :return a cheap suitable allocation for the problem (the max-Nash-welfare allocation), or None if it could not be found.
+    """
+    valuations = to_array(problem.valuation, problem.valuation.num_of_agents)
+    allocation = max_nash_welfare_allocation(valuations)
+    if allocation is None or not is_suitable(problem, valuations, allocation):
+        return None
+    return AllocationMatrix(allocation)
+
+
+def _search(problem:FairAllocationProblem, min_num_of_sharing:int, max_num_of_sharing:int, all_levels:bool, symmetry:Symmetry, profiled:bool, anytime:bool,
+        dispatch_time:float, deadline:float, report)->AllocationMatrix:
+    """
+    The search that runs in the search worker.
+    If profiled, report ("profile", profile) when the search ends (also on timeout).
+    If anytime, report ("upper", allocation) for the cheap upper-bound allocation, and ("lower", bound) after each exhausted level.
+    """
+    profile = None
+    if profiled:
+        profile = [0.0]*len(PROFILE_FIELDS)
+        profile[SPAWN] = perf_counter()-dispatch_time   # perf_counter is system-wide on Linux, so it can be compared across processes.
+    try:
+        if max_num_of_sharing is None:
+            max_num_of_sharing = max_possible_sharing(problem, all_levels)
+        report_lower_bound = None
+        if anytime:
+            allocation = upper_bound_allocation(problem)
+            if allocation is not None and allocation.num_of_sharings() <= max_num_of_sharing:
+                report(("upper", allocation))
+                max_num_of_sharing = allocation.num_of_sharings() - 1
+            report_lower_bound = lambda bound: report(("lower", bound))
+        return find_min_sharing_allocation(problem, min_num_of_sharing, max_num_of_sharing, profile, report_lower_bound, deadline, symmetry)
+    finally:
+        if profiled:
+            report(("profile", profile))
+
+
+UNINTERRUPTIBLE_GRACE_IN_SECONDS = 1   # how long after the deadline the search worker is killed, if it is stuck in a single solver call.
+
+_worker = None   # (owner pid, process, connection) of the search worker of the current process.
+
+
+def _search_worker()->Tuple[multiprocessing.Process, object]:
+    """
+    :return the long-lived search worker of the current process (started on first use, or after the previous one was killed).
+    """
+    global _worker
+    if _worker is None or _worker[0]!=os.getpid():   # a forked process must not share the worker of its parent.
+        (connection, worker_connection) = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_serve, args=(worker_connection,), daemon=True)
+        process.start()
+        worker_connection.close()
+        _worker = (os.getpid(), process, connection)
+    return _worker[1:]
+
+
+def _stop_search_worker():
+    global _worker
+    (_, process, connection) = _worker
+    process.kill()
+    process.join()
+    connection.close()
+    _worker = None
+
+
+def _serve(connection):
+    """
+    The loop of the search worker: receive (function, args, deadline), and send back the result of function(*args, deadline, report).
+    """
+    report = lambda value: connection.send(("Progress", value))
+    while True:
+        try:
+            (function, args, deadline) = connection.recv()
+        except EOFError:
+            return
+        try:
+            connection.send(("OK", function(*args, deadline, report)))
+        except TimeoutError:
+            connection.send(("TimeOut", None))
+        except Exception as err:
+            connection.send(("Error", repr(err)))
+
+
+def _sleep(seconds:float, deadline:float, report)->float:
+    """
+    A function for `run_with_time_limit` that ignores its deadline, like a long uninterruptible solver call.
+    """
+    sleep(seconds)
+    return seconds
+
+
+def run_with_time_limit(function, args:tuple, time_limit_in_seconds:float, on_progress:Callable[[object],None]=None)->Tuple[str,object]:
+    """
+    Run function(*args, deadline, report) in the search worker of the current process.
+    The function should check the deadline (a perf_counter time) cooperatively, and raise TimeoutError once it has passed;
+    every value it passes to `report` is sent to the current process, and passed to on_progress (if given).
+    The worker is reused by the next call, so no process is started per call; it is killed (and restarted on the next call)
+    only if the function does not return within UNINTERRUPTIBLE_GRACE_IN_SECONDS after the deadline, e.g. when it is stuck in a long solver call.
+    :return (status, result), where status is "OK", "TimeOut" or "Error".
+            A result that arrives after the deadline (within the grace period) is returned with the status "TimeOut".
+
+    >>> run_with_time_limit(_sleep, (0.1,), 5)
+    ('OK', 0.1)
+    >>> (worker, _) = _search_worker()
+    >>> run_with_time_limit(_sleep, (60,), 0.1)    # the function hangs past the grace period, so the worker is killed.
+    ('TimeOut', None)
+    >>> worker.is_alive()
+    False
+    >>> run_with_time_limit(_sleep, (0.1,), 5)     # the next call restarts the worker.
+    ('OK', 0.1)
+    >>> _search_worker()[0] is not worker
+    True
+    """
+    (_, connection) = _search_worker()
+    deadline = perf_counter() + time_limit_in_seconds
+    connection.send((function, args, deadline))
+    while connection.poll(max(deadline + UNINTERRUPTIBLE_GRACE_IN_SECONDS - perf_counter(), 0)):
+        try:
+            (status, result) = connection.recv()
+        except EOFError:
+            _stop_search_worker()
+            return ("Error", "The search worker died")
+        if status=="OK" and perf_counter() > deadline:
+            return ("TimeOut", result)
+        if status!="Progress":
+            return (status, result)
+        if on_progress is not None:
+            on_progress(result)
+    _stop_search_worker()
+    return ("TimeOut", None)
+
+
+def find_min_sharing_allocation_with_time_limit(problem:FairAllocationProblem, time_limit_in_seconds:float,
+        min_num_of_sharing:int=0, known_allocation:AllocationMatrix=None, profile:dict=None, sharing_bounds:dict=None, symmetry:Symmetry=None,
+        all_levels:bool=False)->Solution:
+    """
+    Like `problem.find_min_sharing_allocation_with_time_limit`, with optional bounds from other searches.
+
+    :param min_num_of_sharing: a lower bound on the number of sharings (e.g. the PROP optimum, when searching for an EF allocation).
+    :param known_allocation: an allocation that is known to be suitable for this problem (an upper bound).
+    :param profile: if given, it is filled with the PROFILE_FIELDS of the search (also when the search times out,
+                    unless the search worker had to be killed).
+    :param sharing_bounds: if given, the search runs in anytime mode, and this dict is filled with the proven "lower" and "upper" bounds
+                           on the minimum number of sharings. On timeout, the best allocation found (with "upper" sharings) is returned
+                           with the status TimeOut, rather than an ErrorAllocationMatrix.
+    :param symmetry: optional groups of symmetric resources and agents, for skipping equivalent graphs (see `find_min_sharing_allocation`).
+    :param all_levels: if True, the search goes beyond the n-1 levels of fairpy, up to `max_possible_sharing(problem, all_levels=True)`.
+    :return (status, time_in_seconds, allocation).
+    """
+    start = perf_counter()
+    if profile is not None:
+        profile.update({field: 0.0 for field in PROFILE_FIELDS})
+    max_num_of_sharing = None
+    if known_allocation is not None:
+        if known_allocation.num_of_sharings() <= min_num_of_sharing:
+            if sharing_bounds is not None:
+                sharing_bounds.update(lower=known_allocation.num_of_sharings(), upper=known_allocation.num_of_sharings())
+            return ("OK", perf_counter()-start, known_allocation)
+        max_num_of_sharing = known_allocation.num_of_sharings() - 1
+    if sharing_bounds is not None:
+        sharing_bounds.update(lower=min_num_of_sharing, upper=problem.valuation.num_of_agents-1 if max_num_of_sharing is None else max_num_of_sharing+1)
+
+    best_allocation = known_allocation
+    def on_progress(message):
+        nonlocal best_allocation
+        (kind, value) = message
+        if kind=="profile":
+            profile.update(zip(PROFILE_FIELDS, value))
+        elif kind=="upper":
+            best_allocation = value
+            sharing_bounds["upper"] = value.num_of_sharings()
+        elif kind=="lower":
+            sharing_bounds["lower"] = value
+    search_args = (problem, min_num_of_sharing, max_num_of_sharing, all_levels, symmetry, profile is not None, sharing_bounds is not None, perf_counter())
+    (status, allocation) = run_with_time_limit(_search, search_args, time_limit_in_seconds, on_progress)
+
+    if status=="OK" and allocation is None:
+        if best_allocation is None:
+            status = "Error"
+        allocation = best_allocation
+    elif status=="TimeOut" and sharing_bounds is not None:
+        if allocation is not None:   # the search finished after the deadline: its allocation is the best one found.
+            sharing_bounds["upper"] = allocation.num_of_sharings()
+        else:
+            allocation = best_allocation
+    elif status!="OK":
+        allocation = None
+    if status=="OK" and sharing_bounds is not None:
+        sharing_bounds.update(lower=allocation.num_of_sharings(), upper=allocation.num_of_sharings())
+    return (status, perf_counter()-start, ErrorAllocationMatrix() if allocation is None else allocation)
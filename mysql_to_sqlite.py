@@ -1,37 +1,205 @@
 """
 A utility program that reads a MySQL dump file and converts it to an sqlite3 database.
 
+The dump is read statement by statement, so it is never loaded into memory as a whole.
+Only the DDL is rewritten; the rows of each extended INSERT statement are parsed and inserted with executemany,
+all in a single transaction. Indexes are created after all rows are inserted.
+
 AUTHOR: Erel Segal-Halevi
 SINCE:  2020-07-06
 """
 
 import sqlite3, re, sys
+from typing import Iterator, List
+
+MYSQL_ONLY_PATTERNS = [
+    r"NOT NULL AUTO_INCREMENT",
+    r"AUTO_INCREMENT=\d+",
+    r"ENGINE=\w+",
+    r"DEFAULT CHARSET=\w+",
+    r"COLLATE=\w+",
+    r"DEFAULT NULL",
+]
+MYSQL_ONLY_REGEXP = re.compile("|".join(MYSQL_ONLY_PATTERNS))
+INDEX_LINE_REGEXP = re.compile(r"^\s*(UNIQUE\s+)?KEY\s+`([^`]+)`\s*\(([^)]*)\)\s*,?\s*$", re.IGNORECASE)
+CREATE_TABLE_REGEXP = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF NOT EXISTS\s+)?`([^`]+)`", re.IGNORECASE)
+INSERT_REGEXP = re.compile(r"^\s*INSERT\s+INTO\s+`([^`]+)`\s*(\([^)]*\))?\s*VALUES\s*", re.IGNORECASE)
+SKIPPED_STATEMENT_REGEXP = re.compile(r"^\s*(LOCK TABLES|UNLOCK TABLES|SET |/\*)", re.IGNORECASE)
+VALUE_REGEXP = re.compile(r"'((?:[^'\\]|\\.|'')*)'|(NULL)|([-+]?[0-9][0-9.eE+-]*)|(\()|(\))", re.DOTALL)
+MYSQL_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+
+INSERT_BATCH_SIZE = 10000
+
+
+def iterate_statements(lines:Iterator[str])->Iterator[str]:
+    """
+    Split the lines of an SQL dump into statements, at semicolons that are not inside quoted strings or comments.
+    Comment lines between statements are dropped, so every statement starts with its keyword.
+
+    >>> list(iterate_statements(["-- a comment;\\n", "INSERT INTO `t` VALUES ('a;b'),('c\\\\'d');\\n", "DROP TABLE x;"]))
+    ["INSERT INTO `t` VALUES ('a;b'),('c\\\\'d')", 'DROP TABLE x']
+    >>> dump = ["/*!40101 SET NAMES utf8mb4 */;\\n", "\\n", "--\\n", "-- Dumping data for table `instances`\\n", "--\\n", "\\n",
+    ...         "LOCK TABLES `instances` WRITE;\\n", "/*!40000 ALTER TABLE `instances` DISABLE KEYS */;\\n", "INSERT INTO `instances` VALUES (1,'it''s');\\n"]
+    >>> list(iterate_statements(dump))
+    ['/*!40101 SET NAMES utf8mb4 */', 'LOCK TABLES `instances` WRITE', '/*!40000 ALTER TABLE `instances` DISABLE KEYS */', "INSERT INTO `instances` VALUES (1,'it''s')"]
+    """
+    statement = []
+    in_string = False
+    for line in lines:
+        if not in_string and not statement and (line.lstrip().startswith("--") or not line.strip()):
+            continue
+        position = 0
+        while True:
+            if in_string:
+                position = _end_of_string(line, position)
+                if position < 0:
+                    break
+                in_string = False
+            else:
+                quote = line.find("'", position)
+                semicolon = line.find(";", position)
+                if 0 <= semicolon and (quote < 0 or semicolon < quote):
+                    statement.append(line[:semicolon])
+                    text = "".join(statement).strip()
+                    if text:
+                        yield text
+                    statement = []
+                    line = line[semicolon+1:]
+                    position = 0
+                elif 0 <= quote:
+                    in_string = True
+                    position = quote + 1
+                else:
+                    break
+        if statement or line.strip():   # the rest of a line that ends a statement may be only whitespace.
+            statement.append(line)
+    text = "".join(statement).strip()
+    if text:
+        yield text
+
+
+def _end_of_string(line:str, position:int)->int:
+    """
+    :return the position after the closing quote of the string that started before `position`, or -1 if it does not end in this line.
+    """
+    while True:
+        quote = line.find("'", position)
+        backslash = line.find("\\", position)
+        if 0 <= backslash and (quote < 0 or backslash < quote):
+            position = backslash + 2
+        elif quote < 0:
+            return -1
+        elif line.startswith("''", quote):
+            position = quote + 2
+        else:
+            return quote + 1
+
+
+def parse_values(values_text:str)->Iterator[tuple]:
+    """
+    Parse the VALUES part of an extended INSERT statement into row tuples.
+
+    >>> list(parse_values("(1,'a\\\\'b',NULL,2.5),(2,'(x)',NULL,-1e3)"))
+    [(1, "a'b", None, 2.5), (2, '(x)', None, -1000.0)]
+    """
+    row = None
+    for match in VALUE_REGEXP.finditer(values_text):
+        (string, null, number, open_paren, close_paren) = match.groups()
+        if open_paren:
+            row = []
+        elif close_paren:
+            yield tuple(row)
+            row = None
+        elif null:
+            row.append(None)
+        elif number is not None:
+            row.append(float(number) if any(c in number for c in ".eE") else int(number))
+        else:
+            row.append(_unescape(string))
+
+
+def _unescape(string:str)->str:
+    if "\\" not in string and "''" not in string:
+        return string
+    string = re.sub(r"\\(.)", lambda match: MYSQL_ESCAPES.get(match.group(1), match.group(1)), string, flags=re.DOTALL)
+    return string.replace("''", "'")
+
+
+def rewrite_create_table(statement:str, deferred_indexes:List[str])->str:
+    """
+    Remove MySQL-specific clauses from a CREATE TABLE statement.
+    Index definitions (KEY lines) are removed, and the corresponding CREATE INDEX statements are added to deferred_indexes.
+
+    >>> indexes = []
+    >>> print(rewrite_create_table("CREATE TABLE `v` (\\n  `id` int(11) NOT NULL AUTO_INCREMENT,\\n  `iid` int(11) DEFAULT NULL,\\n  PRIMARY KEY (`id`),\\n  KEY `v_iid` (`iid`)\\n) ENGINE=InnoDB AUTO_INCREMENT=6 DEFAULT CHARSET=utf8mb4", indexes))
+    CREATE TABLE `v` (
+      `id` int(11) ,
+      `iid` int(11) ,
+      PRIMARY KEY (`id`)
+    )
+    >>> indexes
+    ['CREATE INDEX IF NOT EXISTS `v_iid` ON `v` (`iid`)']
+    """
+    table = CREATE_TABLE_REGEXP.match(statement).group(1)
+    lines = []
+    for line in statement.split("\n"):
+        index_match = INDEX_LINE_REGEXP.match(line)
+        if index_match:
+            (unique, index_name, columns) = index_match.groups()
+            deferred_indexes.append(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS `{index_name}` ON `{table}` ({columns})")
+        else:
+            lines.append(line)
+    statement = "\n".join(lines)
+    statement = re.sub(r",(\s*\n\s*\))", r"\1", statement)   # a comma may remain before the closing parenthesis.
+    return MYSQL_ONLY_REGEXP.sub("", statement).rstrip()
+
+
+def convert(source:str, target:str):
+    connection = sqlite3.connect(target)
+    connection.execute("PRAGMA journal_mode=OFF")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute("PRAGMA cache_size=-200000")   # 200 MB
+    deferred_indexes = []
+    with open(source, 'r', encoding="utf-8") as sql_file:
+        for statement in iterate_statements(sql_file):
+            if SKIPPED_STATEMENT_REGEXP.match(statement):
+                continue
+            insert_match = INSERT_REGEXP.match(statement)
+            if insert_match:
+                (table, columns) = insert_match.groups()
+                rows = parse_values(statement[insert_match.end():])
+                insert_rows(connection, table, columns, rows)
+            elif CREATE_TABLE_REGEXP.match(statement):
+                connection.execute(rewrite_create_table(statement, deferred_indexes))
+            else:
+                connection.execute(MYSQL_ONLY_REGEXP.sub("", statement))
+    for index_statement in deferred_indexes:
+        connection.execute(index_statement)
+    connection.commit()
+    connection.close()
+
+
+def insert_rows(connection:sqlite3.Connection, table:str, columns:str, rows:Iterator[tuple]):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            _insert_batch(connection, table, columns, batch)
+            batch = []
+    if batch:
+        _insert_batch(connection, table, columns, batch)
+
+
+def _insert_batch(connection:sqlite3.Connection, table:str, columns:str, batch:List[tuple]):
+    placeholders = ",".join("?"*len(batch[0]))
+    connection.executemany(f"INSERT INTO `{table}` {columns or ''} VALUES ({placeholders})", batch)
+
+
+if __name__ == "__main__":
+    if len(sys.argv)<2:
+        print("SYNTAX: python mysql_to_sqlite.py <source>.sql")
+        sys.exit(1)
 
-if len(sys.argv)<2:
-    print("SYNTAX: python mysql_to_sqlite.py <source>.sql")
-    sys.exit(1)
-
-source = sys.argv[1]
-target = source.replace(".sql",".db")
-
-with open(f'{source}','r') as sql_file:
-    sql_text = sql_file.read()
-
-connection = sqlite3.connect(f'{target}')
-sql_text = sql_text.replace("NOT NULL AUTO_INCREMENT", "")
-sql_text = re.sub(r"AUTO_INCREMENT=(\d)+", "", sql_text)
-sql_text = sql_text.replace("AUTO_INCREMENT=6", "")
-sql_text = sql_text.replace("ENGINE=InnoDB", "")
-sql_text = sql_text.replace("DEFAULT NULL", "")
-sql_text = sql_text.replace("DEFAULT CHARSET=utf8mb4", "")
-sql_text = sql_text.replace("DEFAULT CHARSET=utf8s", "")
-sql_text = sql_text.replace("DEFAULT CHARSET=utf8", "")
-sql_text = re.sub(r"LOCK TABLES `[^`]+` WRITE;", "", sql_text)
-sql_text = sql_text.replace("UNLOCK TABLES;", "")
-sql_text = sql_text.replace("\\'", "")
-
-sql_commands = sql_text.split(";")
-for sql_command in sql_commands:
-    connection.executescript(sql_command)
-
-connection.close()
\ No newline at end of file
+    source = sys.argv[1]
+    target = source.replace(".sql",".db")
+    convert(source, target)
@@ -0,0 +1,90 @@
+"""
+Run the instances of an experiment in a pool of worker processes.
+
+The results are added to the experiment's CSV file by the parent process, as soon as each instance finishes,
+so an interrupted run can be resumed exactly like `experiments_csv.Experiment.run`:
+inputs that already have a row in the CSV file are skipped.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List
+
+from experiments_csv import Experiment
+from experiments_csv.Experiment import normalized
+from experiments_csv.dict_product import dict_product
+from experiments_csv.dict_to_row import dict_to_row
+
+import logging, sys
+logger = logging.getLogger(__name__)
+
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.INFO)
+
+
+def pending_inputs(experiment:Experiment, input_ranges:Dict[str,List[Any]])->List[dict]:
+    """
+    Return the inputs in the given ranges that do not have a row in the experiment's results yet.
+    """
+    result = []
+    for input in dict_product(input_ranges):
+        input_normalized = {k:normalized(v) for k,v in input.items()}
+        if experiment.dataFrame is not None:
+            try:
+                existing_row = dict_to_row(experiment.dataFrame, input_normalized)
+            except KeyError as err:
+                raise KeyError(f"You sent an input field that does not have a column in the existing CSV file. Please start a new CSV file. Error: {err}")
+            if existing_row:
+                logger.info("Skipped existing row: %s", existing_row)
+                continue
+        result.append(input)
+    return result
+
+
+def run_parallel(experiment:Experiment, single_run:Callable[..., dict], input_ranges:Dict[str,List[Any]], num_workers:int=None,
+        schedule:Callable[[List[dict]],List[dict]]=None, monitor=None):
+    """
+    Like `experiment.run(single_run, input_ranges)`, but runs the pending inputs in `num_workers` processes.
+
+    :param single_run: a module-level function (so that it can be sent to the worker processes), returning a dict of outputs.
+    :param num_workers: number of worker processes. Default: the number of CPUs. If 1, the inputs run in the current process.
+    :param schedule: an optional function that accepts the list of pending inputs, and returns the inputs to run, in the order they should start
+                     (e.g. `schedule.runtime_schedule`).
+    :param monitor: an optional `progress.ProgressMonitor`, to which each finished input is reported.
+
+    Each worker may start sub-processes of its own (e.g. the search worker of min_sharing_search),
+    which is why the workers come from a ProcessPoolExecutor and not from a (daemonic) multiprocessing.Pool.
+    Rows are added in order of completion, not in order of input.
+    """
+    inputs = pending_inputs(experiment, input_ranges)
+    if schedule is not None:
+        inputs = schedule(inputs)
+    logger.info("%d inputs to run, on %s workers", len(inputs), num_workers or "all")
+    if monitor is not None:
+        monitor.start(inputs, num_workers)
+    if num_workers==1:
+        for input in inputs:
+            add_result(experiment, input, single_run(**input), monitor)
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            future_to_input = {executor.submit(single_run, **input): input for input in inputs}
+            try:
+                for future in as_completed(future_to_input):
+                    add_result(experiment, future_to_input[future], future.result(), monitor)
+            except BaseException:
+                for future in future_to_input:
+                    future.cancel()
+                raise
+    logger.info("\nDone!")
+
+
+def add_result(experiment:Experiment, input:dict, output:dict, monitor=None):
+    if not isinstance(output, dict):
+        raise ValueError(f"single_run must return a dict output, mapping each output variable name to its value. It returned {type(output)}.")
+    input_normalized = {k:normalized(v) for k,v in input.items()}
+    logger.info("\nInput: %s\nOutput: %s", input_normalized, output)
+    experiment.add({**input_normalized, **output})
+    if monitor is not None:
+        monitor.record(input, output)
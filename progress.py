@@ -0,0 +1,142 @@
+"""
+A progress monitor for running sweeps.
+
+`run_parallel` reports each finished instance to the monitor, which keeps a status file (JSON) up to date with:
+the number of instances done and pending, the per-solver counts and rates of each status (OK, TimeOut, Error, ...),
+the rolling throughput (instances per hour), and an estimated time of arrival.
+The ETA is based on the predicted run-time of each pending instance (see `schedule.runtime_predictor`),
+corrected by the ratio of actual to predicted run-times of the instances done so far.
+
+To watch a running sweep from another terminal:
+
+    python progress.py results/progress.json
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import json, os, sys, time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.INFO)
+
+ROLLING_WINDOW = 50   # number of recent completions used for computing the throughput.
+
+
+def run_time_of(output:dict)->float:
+    """
+    The total run-time of the solvers in a single output (duplicates, with time -1, count as 0).
+
+    >>> run_time_of({"prop_status": "OK", "prop_time_in_seconds": 1.5, "ef_time_in_seconds": -1, "ef_num_sharing": 0})
+    1.5
+    """
+    return float(sum(max(value,0) for (column,value) in output.items() if column.endswith("_time_in_seconds")))
+
+
+def status_rates(status_counts:Dict[str,Counter])->Dict[str,Dict[str,float]]:
+    """
+    >>> status_rates({"prop": Counter({"OK": 3, "TimeOut": 1})})
+    {'prop': {'OK': 0.75, 'TimeOut': 0.25}}
+    """
+    return {solver_name: {status: count/sum(counts.values()) for (status,count) in counts.items()}
+            for (solver_name,counts) in status_counts.items()}
+
+
+class ProgressMonitor:
+    def __init__(self, status_file:str, predict:Callable[[List[dict]],np.ndarray]=None):
+        """
+        :param status_file: path to the JSON status file, rewritten after each instance.
+        :param predict: an optional run-time predictor for the ETA (e.g. `runtime_schedule(...).predict`).
+        """
+        self.status_file = status_file
+        self.predict = predict
+        self.start_time = None
+        self.pending = {}
+        self.predicted = {}
+        self.num_done = 0
+        self.status_counts = {}
+        self.completion_times = deque(maxlen=ROLLING_WINDOW)
+        self.actual_time_done = self.predicted_time_done = 0.0
+
+    def start(self, inputs:List[dict], num_workers:int):
+        """
+        Add the inputs of a new run to the pending instances.
+        The counts accumulate over all runs reported to the same monitor (e.g. the sweeps of a driver, or the rounds of an escalating sweep).
+        """
+        self.num_workers = num_workers or os.cpu_count()
+        if self.start_time is None:
+            self.start_time = time.time()
+        new_pending = {_key(input): input for input in inputs}
+        if self.predict is not None and inputs:
+            self.predicted.update(zip(new_pending.keys(), self.predict(inputs)))
+        self.pending.update(new_pending)
+        self.write()
+
+    def record(self, input:dict, output:dict):
+        key = _key(input)
+        self.pending.pop(key, None)
+        self.num_done += 1
+        self.completion_times.append(time.time())
+        for column, value in output.items():
+            if column.endswith("_status"):
+                self.status_counts.setdefault(column[:-len("_status")], Counter())[str(value)] += 1
+        if key in self.predicted:
+            self.actual_time_done += run_time_of(output)
+            self.predicted_time_done += self.predicted.pop(key)
+        status = self.write()
+        logger.info("Progress: %d done, %d pending, %s instances/hour, ETA %s",
+            status["done"], status["pending"], status["instances_per_hour"], status["eta"])
+
+    def instances_per_hour(self)->float:
+        if len(self.completion_times) >= 2 and self.completion_times[-1] > self.completion_times[0]:
+            return 3600 * (len(self.completion_times)-1) / (self.completion_times[-1]-self.completion_times[0])
+        elapsed = time.time() - self.start_time
+        return 3600 * self.num_done / elapsed if self.num_done and elapsed > 0 else None
+
+    def eta_in_seconds(self)->float:
+        if not self.pending:
+            return 0.0
+        if self.predicted:
+            correction = self.actual_time_done/self.predicted_time_done if self.predicted_time_done > 0 else 1.0
+            return correction * sum(self.predicted.values()) / self.num_workers
+        rate = self.instances_per_hour()
+        return 3600 * len(self.pending) / rate if rate else None
+
+    def write(self)->dict:
+        rate = self.instances_per_hour()
+        eta_in_seconds = self.eta_in_seconds()
+        status = {
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "started": datetime.fromtimestamp(self.start_time).isoformat(timespec="seconds"),
+            "done": self.num_done,
+            "pending": len(self.pending),
+            "statuses": {solver_name: dict(counts) for (solver_name,counts) in self.status_counts.items()},
+            "status_rates": status_rates(self.status_counts),
+            "instances_per_hour": None if rate is None else round(rate, 1),
+            "eta_in_seconds": None if eta_in_seconds is None else round(eta_in_seconds),
+            "eta": None if eta_in_seconds is None else datetime.fromtimestamp(time.time()+eta_in_seconds).isoformat(timespec="seconds"),
+        }
+        with open(self.status_file+".tmp", "w") as f:
+            json.dump(status, f, indent=1)
+        os.replace(self.status_file+".tmp", self.status_file)   # so that a reader never sees a partially-written file.
+        return status
+
+
+def _key(input:dict)->tuple:
+    return tuple(sorted(input.items()))
+
+
+if __name__ == "__main__":
+    if len(sys.argv)<2:
+        print("SYNTAX: python progress.py <status file>.json")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        print(json.dumps(json.load(f), indent=1))
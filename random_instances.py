@@ -0,0 +1,102 @@
+"""
+Reproducible random instances.
+
+Each instance has its own random generator, derived from (base_seed, instance_id, num_agents, num_resources),
+so the same instance is generated in every run and in every worker process, independently of the order in which instances are generated.
+Several valuation distributions are supported:
+
+* uniform:    each value is uniform in [0,1).
+* spliddit:   like the Spliddit "rent"/"goods" budgets: each agent divides 1000 points among the resources (integers summing to 1000).
+* correlated: each value is a weighted average of a common value of the resource and a private value of the agent.
+* sparse:     uniform values, of which only a fraction are non-zero (each agent values at least one resource).
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+from typing import Iterable
+
+import numpy as np
+
+BASE_SEED = 2020
+
+SPLIDDIT_BUDGET = 1000
+CORRELATION = 0.7     # weight of the common value, in the correlated distribution.
+DENSITY = 0.3         # fraction of non-zero values, in the sparse distribution.
+
+
+def instance_rng(base_seed:int, instance_id:int, num_agents:int, num_resources:int)->np.random.Generator:
+    """
+    >>> instance_rng(1, 2, 3, 4).random() == instance_rng(1, 2, 3, 4).random()
+    True
+    >>> instance_rng(1, 2, 3, 4).random() == instance_rng(1, 3, 3, 4).random()
+    False
+    """
+    return np.random.default_rng([base_seed, instance_id, num_agents, num_resources])
+
+
+def uniform_valuations(rng:np.random.Generator, size:tuple)->np.ndarray:
+    return rng.random(size)
+
+
+def spliddit_valuations(rng:np.random.Generator, size:tuple)->np.ndarray:
+    """
+    >>> spliddit_valuations(np.random.default_rng(0), (2,3,4)).sum(axis=-1)
+    array([[1000, 1000, 1000],
+           [1000, 1000, 1000]])
+    """
+    proportions = rng.dirichlet(np.ones(size[-1]), size=size[:-1])
+    return rng.multinomial(SPLIDDIT_BUDGET, proportions)
+
+
+def correlated_valuations(rng:np.random.Generator, size:tuple)->np.ndarray:
+    common_values = rng.random((*size[:-2], 1, size[-1]))
+    return CORRELATION*common_values + (1-CORRELATION)*rng.random(size)
+
+
+def sparse_valuations(rng:np.random.Generator, size:tuple)->np.ndarray:
+    """
+    >>> bool(np.all(sparse_valuations(np.random.default_rng(0), (50,3,4)).max(axis=-1) > 0))
+    True
+    """
+    values = rng.random(size)
+    zeros = rng.random(size) >= DENSITY
+    favorite = rng.integers(size[-1], size=size[:-1])   # a resource that each agent surely values.
+    np.put_along_axis(zeros, favorite[...,None], False, axis=-1)
+    values[zeros] = 0
+    return values
+
+
+DISTRIBUTIONS = {
+    "uniform": uniform_valuations,
+    "spliddit": spliddit_valuations,
+    "correlated": correlated_valuations,
+    "sparse": sparse_valuations,
+}
+
+
+def random_valuation(instance_id:int, num_agents:int, num_resources:int, distribution:str="uniform", base_seed:int=BASE_SEED)->np.ndarray:
+    """
+    :return the (num_agents x num_resources) valuation matrix of the given instance.
+
+    >>> random_valuation(5, 2, 3, "spliddit")
+    array([[ 13, 123, 864],
+           [703, 219,  78]])
+    """
+    return DISTRIBUTIONS[distribution](instance_rng(base_seed, instance_id, num_agents, num_resources), (num_agents, num_resources))
+
+
+def random_valuations(instance_ids:Iterable[int], num_agents:int, num_resources:int, distribution:str="uniform", base_seed:int=BASE_SEED)->np.ndarray:
+    """
+    :return a 3-D array, whose i-th matrix is the valuation matrix of the i-th instance (the same as `random_valuation` returns).
+    Used by benchmark.py, which keeps whole instance sets in memory. The experiment drivers call `random_valuation` instead,
+    since each instance is generated in the worker process that solves it.
+
+    >>> bool(np.all(random_valuations(range(3), 2, 3)[2] == random_valuation(2, 2, 3)))
+    True
+    """
+    instance_ids = list(instance_ids)
+    valuations = np.empty((len(instance_ids), num_agents, num_resources), dtype=int if distribution=="spliddit" else float)
+    for (index, instance_id) in enumerate(instance_ids):
+        valuations[index] = random_valuation(instance_id, num_agents, num_resources, distribution, base_seed)
+    return valuations
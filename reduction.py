@@ -0,0 +1,123 @@
+"""
+Reduction of an instance before the min-sharing search.
+
+* Null resources, that all agents value at zero, are dropped. When the allocation is mapped back, each of them is given
+  whole to the first agent, so it adds no sharing. This is exact: null resources do not affect proportionality,
+  envy-freeness or the product of utilities, and an optimal allocation never needs to share them.
+* Identical resources (exactly equal value columns), and agents with proportional valuations (scaled rows, equal up to rounding errors), are symmetric:
+  swapping them maps every suitable allocation to a suitable allocation with the same number of sharings.
+  They are not merged - merging two identical resources may increase the minimum number of sharings
+  (two identical resources can be given to two agents with no sharing, but a merged resource must be shared) -
+  instead, the search skips every consumption graph that is equivalent, under these swaps, to a graph it already tried.
+  Resources that are identical only up to scaling are not symmetric in this sense, so they are left as is.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from duplicates import row_scales, lexicographic_order
+
+Symmetry = Tuple[List[np.ndarray], List[np.ndarray]]   # (groups of symmetric resources, groups of symmetric agents), as indices.
+
+# Scaling a row may change its values by a few units in the last place, so scaled rows are compared with this relative tolerance.
+SCALED_ROWS_RELATIVE_TOLERANCE = 1e-12
+
+
+def symmetry_groups(matrix:np.ndarray, relative_tolerance:float=0)->List[np.ndarray]:
+    """
+    :param relative_tolerance: rows are equal if they are equal up to this relative tolerance (elementwise). Default: exactly equal.
+    :return the groups (of size at least 2) of indices of equal rows.
+
+    >>> symmetry_groups(np.array([[1,2],[3,4],[1,2],[3,5],[1,2]]))
+    [array([0, 2, 4])]
+    >>> symmetry_groups(np.array([[0.1,0.2],[0.1,0.2+1e-10]]))
+    []
+    >>> symmetry_groups(np.array([[0.3,0.7],[0.1*3,0.7]]), SCALED_ROWS_RELATIVE_TOLERANCE)
+    [array([0, 1])]
+    """
+    if len(matrix)==0:
+        return []
+    if relative_tolerance==0:
+        (_, inverse) = np.unique(matrix, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    else:
+        inverse = np.full(len(matrix), -1)
+        for row in range(len(matrix)):
+            if inverse[row] < 0:
+                inverse[(inverse < 0) & np.isclose(matrix, matrix[row], rtol=relative_tolerance, atol=0).all(axis=1)] = row
+    groups = [np.flatnonzero(inverse==index) for index in np.unique(inverse)]
+    return [group for group in groups if len(group) >= 2]
+
+
+def canonical_graph_key(graph:np.ndarray, symmetry:Symmetry)->bytes:
+    """
+    A key of a consumption graph (a boolean agents x resources matrix) such that graphs with the same key are equivalent
+    under permutations of symmetric resources and of symmetric agents. The rows and columns of each group are sorted alternately,
+    until neither order changes (equivalent graphs usually, but not always, get the same key).
+
+    >>> symmetry = ([np.array([0,1])], [])
+    >>> canonical_graph_key(np.array([[1,0],[0,1]], dtype=bool), symmetry) == canonical_graph_key(np.array([[0,1],[1,0]], dtype=bool), symmetry)
+    True
+    >>> canonical_graph_key(np.array([[1,0],[1,1]], dtype=bool), symmetry) == canonical_graph_key(np.array([[1,1],[1,0]], dtype=bool), symmetry)
+    False
+    """
+    (resource_groups, agent_groups) = symmetry
+    graph = np.array(graph, dtype=bool)
+    for _ in range(sum(graph.shape)):
+        previous = graph.copy()
+        for group in resource_groups:
+            graph[:, group] = graph[:, group][:, lexicographic_order(graph[:, group].T)]
+        for group in agent_groups:
+            graph[group] = graph[group][lexicographic_order(graph[group])]
+        if np.array_equal(graph, previous):
+            break
+    return np.packbits(graph).tobytes()
+
+
+class InstanceReduction:
+    def __init__(self, valuations:np.ndarray):
+        """
+        :param valuations: the (agents x resources) valuation matrix.
+        """
+        valuations = np.asarray(valuations, dtype=float)
+        self.num_of_resources = valuations.shape[1]
+        self.kept_resources = np.flatnonzero(valuations.any(axis=0))
+        if len(self.kept_resources)==0:   # nothing to search for; keep the instance as is.
+            self.kept_resources = np.arange(self.num_of_resources)
+        self.valuations = valuations[:, self.kept_resources]
+        self.resource_groups = symmetry_groups(self.valuations.T)
+        self.agent_groups = symmetry_groups(self.valuations / row_scales(self.valuations)[:,None], SCALED_ROWS_RELATIVE_TOLERANCE)
+
+    def symmetry(self)->Symmetry:
+        return (self.resource_groups, self.agent_groups)
+
+    def stats(self)->dict:
+        """
+        >>> InstanceReduction(np.array([[1,1,0,2],[2,2,0,4]])).stats()
+        {'num_null_resources': 1, 'num_identical_resources': 1, 'num_symmetric_agents': 1}
+        """
+        return {
+            "num_null_resources": self.num_of_resources - len(self.kept_resources),
+            "num_identical_resources": sum(len(group)-1 for group in self.resource_groups),
+            "num_symmetric_agents": sum(len(group)-1 for group in self.agent_groups),
+        }
+
+    def reduce_allocation(self, allocation:np.ndarray)->np.ndarray:
+        return np.asarray(allocation)[:, self.kept_resources]
+
+    def expand_allocation(self, allocation:np.ndarray)->np.ndarray:
+        """
+        Map an allocation of the reduced instance back to the original instance.
+
+        >>> InstanceReduction(np.array([[1,0,2],[2,0,1]])).expand_allocation(np.array([[0.5,1],[0.5,0]]))
+        array([[0.5, 1. , 1. ],
+               [0.5, 0. , 0. ]])
+        """
+        expanded = np.zeros((len(allocation), self.num_of_resources))
+        expanded[0] = 1   # null resources go to the first agent.
+        expanded[:, self.kept_resources] = allocation
+        return expanded
@@ -0,0 +1,140 @@
+"""
+A persistent store of solver results, shared by the experiment drivers and check_single_instance.
+
+A result is keyed by the hash of the valuation matrix, the solver name and the solver tolerance.
+An OK result is reused whatever the requested time-limit is, since the min-sharing allocation does not depend on it.
+A TimeOut result is reused only for time-limits that are not larger than the one it timed out with;
+for a larger time-limit the instance is solved again.
+In anytime mode, a TimeOut result is reused only if it has an allocation, and the stored bounds on the number of sharings are reused with it.
+
+The store is an sqlite database, so that several worker processes can share it.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import hashlib, io, sqlite3
+
+import numpy as np
+
+from fairpy.allocations import AllocationMatrix
+from fairpy.items.min_sharing_impl.FairAllocationProblem import ErrorAllocationMatrix
+
+from min_sharing_search import Solution, to_array
+
+RESULT_STORE_FILE = "results/solver_results.db"   # the store of the Spliddit experiments (make_results.py and check_single_instance.py).
+SQLITE_TIMEOUT_IN_SECONDS = 60   # how long a worker waits for another worker that is writing to the store.
+
+
+def matrix_hash(matrix:np.ndarray)->str:
+    """
+    >>> matrix_hash(np.array([[1,2],[3,4]])) == matrix_hash(np.array([[1.,2.],[3.,4.]]))
+    True
+    >>> matrix_hash(np.array([[1,2],[3,4]])) == matrix_hash(np.array([[1,2,3,4]]))
+    False
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=float) + 0.0   # "+0.0" turns -0.0 into 0.0.
+    digest = hashlib.sha1(np.array(matrix.shape, dtype=np.int64).tobytes())
+    digest.update(matrix.tobytes())
+    return digest.hexdigest()
+
+
+def result_key(valuation_array:np.ndarray, solver_name:str, tolerance:float)->tuple:
+    """
+    The key of a result in the store: (matrix_hash, solver_name, tolerance). Only the max-product solvers depend on the tolerance.
+
+    >>> result_key(np.array([[1,2],[3,4]]), "prop", 0.001)[1:]
+    ('prop', '')
+    >>> result_key(np.array([[1,2],[3,4]]), "maxprod1", 0.001)[1:]
+    ('maxprod1', '0.001')
+    """
+    return (matrix_hash(valuation_array), solver_name, str(tolerance) if solver_name.startswith("maxprod") else "")
+
+
+def open_result_store(store_file:str)->sqlite3.Connection:
+    connection = sqlite3.connect(store_file, timeout=SQLITE_TIMEOUT_IN_SECONDS)
+    connection.execute("""create table if not exists results (
+        matrix_hash text, solver_name text, tolerance text,
+        status text, time_limit_in_seconds real, time_in_seconds real, allocation blob,
+        num_sharing_lower integer, num_sharing_upper integer,
+        primary key (matrix_hash, solver_name, tolerance))""")
+    columns = [row[1] for row in connection.execute("pragma table_info(results)")]
+    for column in ["num_sharing_lower", "num_sharing_upper"]:   # stores created before the bounds were stored.
+        if column not in columns:
+            connection.execute(f"alter table results add column {column} integer")
+    connection.commit()
+    return connection
+
+
+def array_to_blob(array:np.ndarray)->bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+def blob_to_array(blob:bytes)->np.ndarray:
+    return np.load(io.BytesIO(blob))
+
+
+def lookup_result(connection:sqlite3.Connection, key:tuple, time_limit_in_seconds:float, sharing_bounds:dict=None)->Solution:
+    """
+    :param key: (matrix_hash, solver_name, tolerance).
+    :param sharing_bounds: if given (in anytime mode), a TimeOut result without an allocation is not reused,
+                           and this dict is filled with the stored "lower" and "upper" bounds of a reused result.
+    :return the stored solution if it can be reused with the given time-limit, or None.
+    """
+    rows = connection.execute("""select status, time_limit_in_seconds, time_in_seconds, allocation, num_sharing_lower, num_sharing_upper
+        from results where matrix_hash=? and solver_name=? and tolerance=?""", key).fetchall()
+    if len(rows)==0:
+        return None
+    (status, stored_time_limit, time_in_seconds, allocation, lower, upper) = rows[0]
+    if status=="OK":
+        solution = (status, time_in_seconds, AllocationMatrix(blob_to_array(allocation)))
+    elif status=="TimeOut" and time_limit_in_seconds <= stored_time_limit:
+        if sharing_bounds is None or allocation is None:   # without anytime mode, a timed-out search returns no allocation.
+            solution = (status, time_in_seconds, ErrorAllocationMatrix())
+        else:
+            solution = (status, time_in_seconds, AllocationMatrix(blob_to_array(allocation)))
+    else:
+        return None
+    if sharing_bounds is not None:
+        if isinstance(solution[2], ErrorAllocationMatrix):
+            return None
+        sharing_bounds.update({bound: value for (bound, value) in [("lower", lower), ("upper", upper)] if value is not None})
+    return solution
+
+
+def store_result(connection:sqlite3.Connection, key:tuple, time_limit_in_seconds:float, solution:Solution, num_of_agents:int, sharing_bounds:dict=None):
+    """
+    Store an OK or TimeOut solution (errors are not stored, so they are retried).
+    The allocation of a TimeOut solution is stored too, if the search found one (in anytime mode), and so are the sharing bounds.
+    """
+    (status, time_in_seconds, allocation) = solution
+    if status not in ["OK", "TimeOut"]:
+        return
+    allocation_blob = None if isinstance(allocation, ErrorAllocationMatrix) else array_to_blob(to_array(allocation, num_of_agents))
+    sharing_bounds = sharing_bounds or {}
+    connection.execute("""insert or replace into results (matrix_hash, solver_name, tolerance, status, time_limit_in_seconds, time_in_seconds, allocation,
+        num_sharing_lower, num_sharing_upper) values (?,?,?,?,?,?,?,?,?)""",
+        (*key, status, time_limit_in_seconds, time_in_seconds, allocation_blob, sharing_bounds.get("lower"), sharing_bounds.get("upper")))
+    connection.commit()
+
+
+def memoized(store_file:str, solver_name:str, valuation_array:np.ndarray, tolerance:float, time_limit_in_seconds:float, solve_function,
+        sharing_bounds:dict=None)->Solution:
+    """
+    Return the stored solution if it can be reused; otherwise, call solve_function() and store its solution.
+    :param store_file: path to the store. If None, solve_function() is just called.
+    :param sharing_bounds: the sharing bounds dict that solve_function fills in anytime mode (None otherwise);
+                           for a reused solution, it is filled with the stored bounds.
+    """
+    if store_file is None:
+        return solve_function()
+    key = result_key(valuation_array, solver_name, tolerance)
+    connection = open_result_store(store_file)
+    solution = lookup_result(connection, key, time_limit_in_seconds, sharing_bounds)
+    if solution is None:
+        solution = solve_function()
+        store_result(connection, key, time_limit_in_seconds, solution, len(valuation_array), sharing_bounds)
+    connection.close()
+    return solution
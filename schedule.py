@@ -0,0 +1,147 @@
+"""
+Cost-aware scheduling of experiment instances.
+
+The run-time of an instance is predicted from its shape (num_agents, num_resources),
+using the run-times recorded in existing result files.
+The pending instances are then run longest-first, so that the expensive instances
+do not end up running alone at the end of a parallel sweep.
+Optionally, only the cheapest instances that fit in a given time budget are run.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+import os
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pandas
+
+from columnar_results import read_results, result_columns
+
+TIME_COLUMNS = ["prop_time_in_seconds", "ef_time_in_seconds", "maxprod1_time_in_seconds"]
+DEFAULT_SECONDS_PER_INSTANCE = 1.0   # used when there are no past results at all.
+
+
+def read_past_runtimes(results_files:List[str])->pandas.DataFrame:
+    """
+    Read the total run-time of each past instance from the given result files - CSV or columnar (missing files are ignored).
+    Only the shape and time columns are read.
+    :return a DataFrame with columns instance_id, num_agents, num_resources, total_time.
+    """
+    frames = []
+    for results_file in results_files:
+        if not os.path.exists(results_file):
+            continue
+        columns = result_columns(results_file)
+        time_columns = [column for column in TIME_COLUMNS if column in columns]
+        if not time_columns or "num_agents" not in columns:
+            continue
+        results = read_results(results_file, columns=["instance_id", "num_agents", "num_resources", *time_columns])
+        times = results[time_columns]
+        results = results.loc[(times>=0).any(axis=1)]    # duplicates are recorded with time -1.
+        frames.append(pandas.DataFrame({
+            "instance_id": results["instance_id"],
+            "num_agents": results["num_agents"],
+            "num_resources": results["num_resources"],
+            "total_time": times.loc[results.index].clip(lower=0).sum(axis=1),
+        }))
+    if not frames:
+        return pandas.DataFrame(columns=["instance_id", "num_agents", "num_resources", "total_time"])
+    return pandas.concat(frames, ignore_index=True)
+
+
+def predict_runtimes(shapes:np.ndarray, past_runtimes:pandas.DataFrame)->np.ndarray:
+    """
+    Predict the total run-time of instances with the given shapes.
+    Shapes that appear in the past results get the median run-time of that shape;
+    other shapes get the prediction of a log-linear model fitted on all past results.
+
+    :param shapes: an (k,2) array; each row is (num_agents, num_resources).
+
+    >>> past = pandas.DataFrame({"num_agents": [2,2,3,3,4], "num_resources": [3,3,3,5,5], "total_time": [0.1,0.3,1,10,100]})
+    >>> np.round(predict_runtimes(np.array([[2,3],[3,5],[4,5]]), past), 3)
+    array([  0.2,  10. , 100. ])
+    >>> bool(predict_runtimes(np.array([[5,5]]), past)[0] > 100)
+    True
+    """
+    shapes = np.asarray(shapes).reshape(-1,2)
+    if len(past_runtimes)==0:
+        return np.full(len(shapes), DEFAULT_SECONDS_PER_INSTANCE)
+    features = lambda num_agents, num_resources: np.column_stack([np.ones(len(num_agents)), num_agents, np.log(num_resources)])
+    log_times = np.log(np.maximum(past_runtimes["total_time"].to_numpy(dtype=float), 1e-3))
+    (coefficients, _, _, _) = np.linalg.lstsq(
+        features(past_runtimes["num_agents"].to_numpy(dtype=float), past_runtimes["num_resources"].to_numpy(dtype=float)),
+        log_times, rcond=None)
+    predictions = np.exp(features(shapes[:,0].astype(float), shapes[:,1].astype(float)) @ coefficients)
+    medians = past_runtimes.groupby(["num_agents","num_resources"])["total_time"].median()
+    for (row, (num_agents, num_resources)) in enumerate(shapes.tolist()):
+        if (num_agents, num_resources) in medians.index:
+            predictions[row] = medians[(num_agents, num_resources)]
+    return predictions
+
+
+def longest_first(inputs:List[dict], costs:np.ndarray)->List[dict]:
+    """
+    >>> longest_first([{"id":1},{"id":2},{"id":3}], np.array([5,9,1]))
+    [{'id': 2}, {'id': 1}, {'id': 3}]
+    """
+    order = np.argsort(-np.asarray(costs), kind="stable")
+    return [inputs[i] for i in order]
+
+
+def cheapest_within_budget(inputs:List[dict], costs:np.ndarray, budget_in_seconds:float)->List[dict]:
+    """
+    Select the cheapest inputs whose total predicted cost is at most the budget.
+
+    >>> cheapest_within_budget([{"id":1},{"id":2},{"id":3}], np.array([5,9,1]), budget_in_seconds=7)
+    [{'id': 1}, {'id': 3}]
+    """
+    order = np.argsort(np.asarray(costs), kind="stable")
+    within_budget = np.cumsum(np.asarray(costs)[order]) <= budget_in_seconds
+    return [inputs[i] for i in sorted(order[within_budget])]
+
+
+def input_shape(input:dict)->Tuple[int,int]:
+    return (input["num_agents"], input["num_resources"])
+
+
+def runtime_predictor(results_files:List[str], shape_of:Callable[[dict],Tuple[int,int]]=input_shape)->Callable[[List[dict]],np.ndarray]:
+    """
+    :param results_files: past result files, used for predicting the run-times.
+    :param shape_of: maps an input dict to (num_agents, num_resources). By default, takes them from the input itself (random instances).
+    :return a function that accepts a list of inputs and returns their predicted total run-times,
+            capped by the time-limit of each of the solvers.
+    """
+    past_runtimes = read_past_runtimes(results_files)
+    def predict(inputs:List[dict])->np.ndarray:
+        if not inputs:
+            return np.zeros(0)
+        costs = predict_runtimes(np.array([shape_of(input) for input in inputs]), past_runtimes)
+        time_limits = np.array([input.get("time_limit_in_seconds", np.inf) for input in inputs], dtype=float)
+        return np.minimum(costs, len(TIME_COLUMNS)*time_limits)
+    return predict
+
+
+def runtime_schedule(results_files:List[str], shape_of:Callable[[dict],Tuple[int,int]]=input_shape, budget_in_seconds:float=None)->Callable[[List[dict]],List[dict]]:
+    """
+    Create a schedule for `parallel_experiment.run_parallel`.
+
+    :param results_files: past result files, used for predicting the run-times.
+    :param shape_of: maps an input dict to (num_agents, num_resources). By default, takes them from the input itself (random instances).
+    :param budget_in_seconds: if given, only the cheapest inputs whose total predicted run-time (over all workers) fits in the budget are run.
+    :return a function that accepts the pending inputs and returns them, longest-first.
+            Its attribute `predict` is the run-time predictor (see `runtime_predictor`).
+    """
+    predict = runtime_predictor(results_files, shape_of)
+    def schedule(inputs:List[dict])->List[dict]:
+        if not inputs:
+            return inputs
+        costs = predict(inputs)
+        if budget_in_seconds is not None:
+            selected = cheapest_within_budget(list(range(len(inputs))), costs, budget_in_seconds)
+            inputs = [inputs[i] for i in selected]
+            costs = costs[selected]
+        return longest_first(inputs, costs)
+    schedule.predict = predict
+    return schedule
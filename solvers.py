@@ -0,0 +1,212 @@
+"""
+Run the three min-sharing solvers (PROP, EF and approximate max-product) on a single instance,
+either one after the other or concurrently, and collect their outcomes into a result row.
+By default, each solver runs the search of fairpy itself (`problem.find_min_sharing_allocation_with_time_limit`).
+With min_sharing_search=True, it runs the search of min_sharing_search.py instead, which supports bounds, profiling, anytime mode and reduction;
+then, the result of the PROP search is used to bound the EF search, when they run one after the other.
+Check min_sharing_search.py against fairpy with check_min_sharing_search.py before relying on it.
+
+AUTHOR: Erel Segal-Halevi
+SINCE:  2026-10
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple
+
+from fairpy.valuations import ValuationMatrix
+from fairpy.allocations import AllocationMatrix
+
+from fairpy.items.min_sharing_impl.FairAllocationProblem import FairAllocationProblem, ErrorAllocationMatrix
+from fairpy.items.min_sharing_impl.FairEnvyFreeAllocationProblem import FairEnvyFreeAllocationProblem
+from fairpy.items.min_sharing_impl.FairProportionalAllocationProblem import FairProportionalAllocationProblem
+from fairpy.items.min_sharing_impl.FairMaxProductAllocationProblem import FairMaxProductAllocationProblem
+
+from min_sharing_search import find_min_sharing_allocation_with_time_limit, to_array, Solution, PROFILE_FIELDS
+from result_store import memoized
+from reduction import InstanceReduction
+from metrics import product_of_utilities
+
+import numpy as np
+
+TOLERANCE = 0.001
+SOLVER_NAMES = ["prop", "ef", "maxprod1"]
+SOLVER_TITLES = {"prop": "Proportional", "ef": "Envy-Free", "maxprod1": f"{TOLERANCE}-Max-product"}
+
+# Maps a solver to the solver whose result bounds its search.
+# Every envy-free allocation is proportional, so the PROP optimum is a lower bound for EF,
+# and a PROP-optimal allocation that happens to be envy-free is EF-optimal.
+# The approximate max-product solver gets no bound: with a positive tolerance, its allocations need not be proportional.
+WARM_START_FROM = {"ef": "prop"}
+
+
+def allocation_array(allocation:AllocationMatrix, valuation_matrix:ValuationMatrix)->np.ndarray:
+    """
+    The allocation as an (agents x resources) array, or a NaN array for an ErrorAllocationMatrix (as expected by `metrics.batch_metrics`).
+    """
+    if isinstance(allocation, ErrorAllocationMatrix):
+        return np.full((valuation_matrix.num_of_agents, valuation_matrix.num_of_objects), np.nan)
+    return to_array(allocation, valuation_matrix.num_of_agents)
+
+
+def make_problem(solver_name:str, valuation_matrix:ValuationMatrix, tolerance:float=TOLERANCE)->FairAllocationProblem:
+    """
+    :param tolerance: the tolerance of the max-product solver. If None, the fairpy default is used.
+    """
+    if solver_name=="prop":
+        return FairProportionalAllocationProblem(valuation_matrix)
+    elif solver_name=="ef":
+        return FairEnvyFreeAllocationProblem(valuation_matrix)
+    elif solver_name=="maxprod1":
+        return FairMaxProductAllocationProblem(valuation_matrix) if tolerance is None else FairMaxProductAllocationProblem(valuation_matrix, tolerance=tolerance)
+    else:
+        raise ValueError("Unknown solver "+solver_name)
+
+
+def solve(solver_name:str, valuation_matrix:ValuationMatrix, time_limit_in_seconds:float, tolerance:float=TOLERANCE,
+        min_num_of_sharing:int=0, known_allocation:AllocationMatrix=None, result_store:str=None, profile:dict=None, sharing_bounds:dict=None, reduce:bool=False,
+        min_sharing_search:bool=False, all_levels:bool=False)->Solution:
+    """
+    :param min_sharing_search: if True, the search of min_sharing_search.py is used; otherwise, the search of fairpy.
+                               The bounds, profile, sharing_bounds, reduce and all_levels options require min_sharing_search=True.
+    :param min_num_of_sharing, known_allocation: bounds for the search - see `min_sharing_search.find_min_sharing_allocation_with_time_limit`.
+    :param result_store: path to a `result_store` file, for reusing results of previous runs. If None, the instance is always solved.
+    :param profile: if given, it is filled with the per-phase timings of the search (see `min_sharing_search.PROFILE_FIELDS`).
+                    It stays empty if the result is taken from the result store.
+    :param sharing_bounds: if given, the search runs in anytime mode, and this dict is filled with the "lower" and "upper" bounds
+                           on the number of sharings (see `min_sharing_search.find_min_sharing_allocation_with_time_limit`).
+                           If the result is taken from the result store, it is filled with the stored bounds.
+    :param reduce: if True, null resources are dropped, and graphs that are symmetric to graphs already tried are skipped (see `reduction.py`).
+                   The result is the same, so it is shared with unreduced runs in the result store.
+    :param all_levels: if True, the search goes beyond the n-1 sharings searched by fairpy (see `min_sharing_search.max_possible_sharing`).
+                       Its results are stored separately in the result store.
+    """
+    if not min_sharing_search and (min_num_of_sharing>0 or known_allocation is not None or profile is not None or sharing_bounds is not None or reduce or all_levels):
+        raise ValueError("Bounds, profiling, anytime mode, reduction and all_levels require min_sharing_search=True")
+    def solve_function():
+        if not min_sharing_search:
+            return make_problem(solver_name, valuation_matrix, tolerance).find_min_sharing_allocation_with_time_limit(time_limit_in_seconds=time_limit_in_seconds)
+        if not reduce:
+            problem = make_problem(solver_name, valuation_matrix, tolerance)
+            return find_min_sharing_allocation_with_time_limit(problem, time_limit_in_seconds, min_num_of_sharing, known_allocation, profile, sharing_bounds,
+                all_levels=all_levels)
+        reduction = InstanceReduction(valuation_array)
+        problem = make_problem(solver_name, ValuationMatrix(reduction.valuations), tolerance)
+        reduced_known_allocation = None if known_allocation is None else AllocationMatrix(reduction.reduce_allocation(to_array(known_allocation, len(valuation_array))))
+        (status, time_in_seconds, allocation) = find_min_sharing_allocation_with_time_limit(problem, time_limit_in_seconds, min_num_of_sharing, reduced_known_allocation,
+            profile, sharing_bounds, reduction.symmetry(), all_levels)
+        if not isinstance(allocation, ErrorAllocationMatrix):
+            allocation = AllocationMatrix(reduction.expand_allocation(to_array(allocation, len(valuation_array))))
+        return (status, time_in_seconds, allocation)
+    valuation_array = to_array(valuation_matrix, valuation_matrix.num_of_agents)
+    store_solver_name = solver_name+"_all_levels" if all_levels else solver_name
+    return memoized(result_store, store_solver_name, valuation_array, tolerance, time_limit_in_seconds, solve_function, sharing_bounds)
+
+
+def solve_and_profile(*args, profiled:bool=False, anytime:bool=False, **kwargs)->Tuple[Solution,dict,dict]:
+    """
+    Like `solve`, but returns the profile (None unless profiled) and the sharing bounds (None unless anytime) along with the solution,
+    so that they can be sent back from a worker process.
+    """
+    profile = {} if profiled else None
+    sharing_bounds = {} if anytime else None
+    return (solve(*args, profile=profile, sharing_bounds=sharing_bounds, **kwargs), profile, sharing_bounds)
+
+
+def is_envy_free(allocation:AllocationMatrix, valuation_matrix:ValuationMatrix)->bool:
+    """
+    >>> is_envy_free(AllocationMatrix([[1,0],[0,1]]), ValuationMatrix([[3,1],[1,3]]))
+    True
+    >>> is_envy_free(AllocationMatrix([[0,1],[1,0]]), ValuationMatrix([[3,1],[1,3]]))
+    False
+    """
+    valuations = to_array(valuation_matrix, valuation_matrix.num_of_agents)
+    bundles = to_array(allocation, valuation_matrix.num_of_agents)
+    utilities = valuations @ bundles.T   # utilities[i,j] = the value of agent i to the bundle of agent j.
+    tolerance = 1e-9 * valuations.sum(axis=1)
+    return bool(np.all(utilities.diagonal()[:,None] >= utilities - tolerance[:,None]))
+
+
+def warm_start_bounds(solver_name:str, solutions:Dict[str,Solution], valuation_matrix:ValuationMatrix)->dict:
+    """
+    Compute the bounds for the search of the given solver, from the solutions already found by other solvers.
+    :return keyword arguments for `solve`.
+    """
+    if solver_name not in WARM_START_FROM or WARM_START_FROM[solver_name] not in solutions:
+        return {}
+    (status, _, allocation) = solutions[WARM_START_FROM[solver_name]]
+    if status!="OK":
+        return {}
+    bounds = {"min_num_of_sharing": allocation.num_of_sharings()}
+    if solver_name=="ef" and is_envy_free(allocation, valuation_matrix):
+        bounds["known_allocation"] = allocation
+    return bounds
+
+
+def solve_all(valuation_matrix:ValuationMatrix, time_limit_in_seconds:float, concurrent:bool=False, tolerance:float=TOLERANCE, warm_start:bool=True,
+        result_store:str=None, profiles:dict=None, sharing_bounds:dict=None, reduce:bool=False, min_sharing_search:bool=False, all_levels:bool=False)->Dict[str,Solution]:
+    """
+    Run all solvers on the given instance.
+    :param concurrent: if True, the solvers run in parallel processes, so the wall-clock time is the maximum of their times rather than the sum.
+    :param warm_start: if True, the result of each solver in WARM_START_FROM is used to bound the search of the next one.
+                       It is ignored when concurrent: a warm-started solver would have to wait for its source solver,
+                       so the wall-clock time would be the sum of their times. It is ignored also without min_sharing_search, since the search of fairpy takes no bounds.
+    :param result_store: path to a `result_store` file (optional).
+    :param profiles: if given, it is filled with a profile for each solver name (see `solve`).
+    :param sharing_bounds: if given, the solvers run in anytime mode, and it is filled with the sharing bounds of each solver name (see `solve`).
+    :param reduce: if True, each solver searches the reduced instance (see `solve`).
+    :param min_sharing_search, all_levels: see `solve`.
+    :return a dict mapping each solver name to its solution.
+    """
+    solutions = {}
+    if not concurrent:
+        for solver_name in SOLVER_NAMES:
+            bounds = warm_start_bounds(solver_name, solutions, valuation_matrix) if warm_start and min_sharing_search else {}
+            profile = None if profiles is None else profiles.setdefault(solver_name, {})
+            solver_bounds = None if sharing_bounds is None else sharing_bounds.setdefault(solver_name, {})
+            solutions[solver_name] = solve(solver_name, valuation_matrix, time_limit_in_seconds, tolerance, result_store=result_store, profile=profile, sharing_bounds=solver_bounds, reduce=reduce,
+                min_sharing_search=min_sharing_search, all_levels=all_levels, **bounds)
+        return solutions
+    profiled = profiles is not None
+    anytime = sharing_bounds is not None
+    with ProcessPoolExecutor(max_workers=len(SOLVER_NAMES)) as executor:
+        futures = {solver_name: executor.submit(solve_and_profile, solver_name, valuation_matrix, time_limit_in_seconds, tolerance, result_store=result_store, profiled=profiled, anytime=anytime, reduce=reduce,
+                min_sharing_search=min_sharing_search, all_levels=all_levels)
+            for solver_name in SOLVER_NAMES}
+        for solver_name in SOLVER_NAMES:
+            (solutions[solver_name], profile, solver_bounds) = futures[solver_name].result()
+            if profiles is not None:
+                profiles[solver_name] = profile
+            if anytime:
+                sharing_bounds[solver_name] = solver_bounds
+        return solutions
+
+
+def solutions_to_row(solutions:Dict[str,Solution], valuation_matrix:ValuationMatrix, profiles:dict=None, sharing_bounds:dict=None)->dict:
+    """
+    Convert the solutions to the columns of a result row: <solver>_status, <solver>_time_in_seconds, <solver>_num_sharing, <solver>_product.
+    :param profiles: if given, the columns <solver>_<field> are added for each of the PROFILE_FIELDS (NaN for results taken from the result store).
+    :param sharing_bounds: if given, the columns <solver>_num_sharing_lower and <solver>_num_sharing_upper are added (NaN for results stored without bounds).
+    """
+    valuations = to_array(valuation_matrix, valuation_matrix.num_of_agents)
+    allocations = np.array([allocation_array(allocation, valuation_matrix) for (_, _, allocation) in solutions.values()])
+    products = dict(zip(solutions, product_of_utilities(np.broadcast_to(valuations, allocations.shape), allocations)))
+    row = {}
+    for solver_name,(status, time_in_seconds, allocation) in solutions.items():
+        row[f"{solver_name}_status"] = status
+        row[f"{solver_name}_time_in_seconds"] = time_in_seconds
+        row[f"{solver_name}_num_sharing"] = allocation.num_of_sharings()
+        row[f"{solver_name}_product"] = products[solver_name]
+        if profiles is not None:
+            for field in PROFILE_FIELDS:
+                row[f"{solver_name}_{field}"] = profiles.get(solver_name, {}).get(field, np.nan)
+        if sharing_bounds is not None:
+            for bound in ["lower", "upper"]:
+                row[f"{solver_name}_num_sharing_{bound}"] = sharing_bounds.get(solver_name, {}).get(bound, np.nan)
+    return row
+
+
+def print_solutions(solutions:Dict[str,Solution], row:dict):
+    for solver_name,(status, time_in_seconds, allocation) in solutions.items():
+        print(f"\n{SOLVER_TITLES[solver_name]} Allocation: \n", allocation)
+        print("Status: {}, #sharing: {}, product: {}, time: {}".format(status, row[f"{solver_name}_num_sharing"], row[f"{solver_name}_product"], time_in_seconds))
+    print(flush=True)
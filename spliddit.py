@@ -7,8 +7,9 @@ SINCE:  2020-07
 """
 
 SPLIDDIT_DATABASE_FILE = 'spliddit-2020-07-31-goods-real.db'
+SPLIDDIT_USE_CACHE = True   # read instances from a memory-mapped cache file next to the database (see `instance_cache`).
 
-import sqlite3, numpy as np
+import sqlite3, itertools, hashlib, os, struct, zipfile, numpy as np
 
 # Application IDs:
 
@@ -16,6 +17,21 @@ SPLIDDIT_GOODS = 2
 SPLIDDIT_TASKS = 5
 
 
+def spliddit_connection(database_file:str=None)->sqlite3.Connection:
+    """
+    Open a connection to the Spliddit database.
+    Creates the index on valuations(instance_id) if it is missing,
+    so that the per-instance queries do not scan the entire valuations table.
+    """
+    connection = sqlite3.connect(database_file or SPLIDDIT_DATABASE_FILE)
+    try:
+        connection.execute("create index if not exists valuations_instance_id on valuations(instance_id)")
+        connection.commit()
+    except sqlite3.OperationalError:
+        pass   # read-only database - the queries still work, only slower.
+    return connection
+
+
 def spliddit_instances(first_id:int=0, application_id=SPLIDDIT_GOODS, remove_demo_instances=False):
     """
     Generate all "divide-goods" instances from the Spliddit database.
@@ -24,41 +40,96 @@ def spliddit_instances(first_id:int=0, application_id=SPLIDDIT_GOODS, remove_dem
 
     :return yields pairs (instance_id, valuation_matrix)
     """
-    connection = sqlite3.connect(SPLIDDIT_DATABASE_FILE)
-    instances_query = "select id from instances where application_id={} group by id having id>={}".format(application_id,first_id)
-    for (instance_id,) in query_to_array(connection, instances_query):
-        (agent_count, resource_count) = query_to_array(connection, "select count(distinct agent_id),count(distinct resource_id) from valuations where instance_id={}".format(instance_id))[0]
-        valuation_list = query_to_array(connection, "select agent_id,resource_id,value from valuations where instance_id={}".format(instance_id))
-        valuation_matrix = valuation_list_to_valuation_matrix(valuation_list, agent_count, resource_count)
+    if SPLIDDIT_USE_CACHE:
+        cache = instance_cache()
+        for instance_id in spliddit_instances_ids(first_id, application_id):
+            yield (instance_id, cached_valuation_matrix(cache, instance_id))
+    else:
+        yield from spliddit_instances_from_database(first_id, application_id)
+
+
+def spliddit_instances_from_database(first_id:int=0, application_id=SPLIDDIT_GOODS, database_file:str=None):
+    """
+    Generate the instances of the given application directly from the database.
+    The valuations table is read in a single pass, ordered by instance_id,
+    instead of running separate queries for each instance.
+
+    :return yields pairs (instance_id, valuation_matrix)
+    """
+    connection = spliddit_connection(database_file)
+    instance_ids = spliddit_instances_ids(first_id, application_id, connection=connection)
+    valuations_query = """
+        select instance_id,agent_id,resource_id,value from valuations
+        where instance_id in (select id from instances where application_id=? and id>=?)
+        order by instance_id, rowid"""
+    cursor = connection.execute(valuations_query, (application_id, first_id))
+    valuation_groups = itertools.groupby(cursor, key=lambda row: row[0])
+    (group_id, group_rows) = next(valuation_groups, (None, None))
+    for instance_id in instance_ids:
+        valuation_list = []
+        while group_id is not None and group_id <= instance_id:
+            if group_id == instance_id:
+                valuation_list = np.array([row[1:] for row in group_rows])
+            (group_id, group_rows) = next(valuation_groups, (None, None))
+        valuation_matrix = valuation_list_to_valuation_matrix(valuation_list)
         yield (instance_id, valuation_matrix)
     connection.close()
 
 
-def spliddit_instances_ids(first_id:int=0, application_id=SPLIDDIT_GOODS)->list:
+def spliddit_instances_ids(first_id:int=0, application_id=SPLIDDIT_GOODS, connection:sqlite3.Connection=None)->list:
     """
     Return a list of integers representing instance IDs.
     """
-    connection = sqlite3.connect(SPLIDDIT_DATABASE_FILE)
-    instances_query = "select id from instances where application_id={} group by id having id>={}".format(application_id,first_id)
-    result = [id[0] for id in query_to_array(connection, instances_query)]
-    connection.close()
+    if connection is None and SPLIDDIT_USE_CACHE:
+        index = instance_cache()["index"]
+        selected = (index[:,INDEX_APPLICATION_ID]==application_id) & (index[:,INDEX_INSTANCE_ID]>=first_id)
+        return index[selected, INDEX_INSTANCE_ID].tolist()
+    own_connection = connection is None
+    if own_connection:
+        connection = sqlite3.connect(SPLIDDIT_DATABASE_FILE)
+    instances_query = "select id from instances where application_id=? group by id having id>=? order by id"
+    result = [id[0] for id in query_to_array(connection, instances_query, (application_id, first_id))]
+    if own_connection:
+        connection.close()
     return result
 
 
-def spliddit_instance(instance_id:int):
+def spliddit_instance_shape(instance_id:int)->tuple:
+    """
+    Return the pair (num_agents, num_resources) of the given instance, without building its valuation matrix.
+    """
+    if SPLIDDIT_USE_CACHE:
+        row = cached_index_row(instance_cache(), instance_id)
+        return (int(row[INDEX_NUM_AGENTS]), int(row[INDEX_NUM_RESOURCES]))
+    connection = spliddit_connection()
+    (shape,) = query_to_array(connection, "select count(distinct agent_id),count(distinct resource_id) from valuations where instance_id=?", (instance_id,))
+    connection.close()
+    return shape
+
+
+def spliddit_instance(instance_id:int, connection:sqlite3.Connection=None):
     """
     Return a single valuation matrix representing a Spliddit instance.
+    :param connection: an open connection to the database (optional).
+              If not given and SPLIDDIT_USE_CACHE is set, the matrix is sliced from the instance cache without touching the database.
     :return A valuation_matrix.
     """
-    connection = sqlite3.connect(SPLIDDIT_DATABASE_FILE)
-    application_ids = query_to_array(connection, "select application_id from instances where id={}".format(instance_id))
-    if len(application_ids)==0:
-        raise ValueError("Instance {} not found".format(instance_id))
-    (application_id,) = application_ids[0]
-    (agent_count, resource_count) = query_to_array(connection, "select count(distinct agent_id),count(distinct resource_id) from valuations where instance_id={}".format(instance_id))[0]
-    valuation_list = query_to_array(connection, "select agent_id,resource_id,value from valuations where instance_id={}".format(instance_id))
-    valuation_matrix = valuation_list_to_valuation_matrix(valuation_list, agent_count, resource_count)
-    connection.close()
+    if connection is None and SPLIDDIT_USE_CACHE:
+        cache = instance_cache()
+        application_id = cached_application_id(cache, instance_id)
+        valuation_matrix = cached_valuation_matrix(cache, instance_id)
+    else:
+        own_connection = connection is None
+        if own_connection:
+            connection = spliddit_connection()
+        application_ids = query_to_array(connection, "select application_id from instances where id=?", (instance_id,))
+        if len(application_ids)==0:
+            raise ValueError("Instance {} not found".format(instance_id))
+        (application_id,) = application_ids[0]
+        valuation_array = np.array(query_to_array(connection, "select agent_id,resource_id,value from valuations where instance_id=? order by rowid", (instance_id,)))
+        valuation_matrix = valuation_list_to_valuation_matrix(valuation_array)
+        if own_connection:
+            connection.close()
     if application_id==SPLIDDIT_GOODS:
         return valuation_matrix
     elif application_id==SPLIDDIT_TASKS:
@@ -70,50 +141,208 @@ def spliddit_instance(instance_id:int):
 
 
 
-def query_to_array(connection, query:str):
+def query_to_array(connection, query:str, parameters:tuple=()):
     cursor = connection.cursor()
-    cursor.execute(query)
+    cursor.execute(query, parameters)
     return cursor.fetchall()
 
 
 
 
-def valuation_list_to_valuation_matrix(valuation_list:list, agent_count:int, resource_count:int):
+
+def first_appearance_indices(ids:np.ndarray)->np.ndarray:
+    """
+    Map each id to the index of its first appearance among the distinct ids.
+
+    >>> first_appearance_indices(np.array([5779, 5778, 5779, 5790, 5778]))
+    array([0, 1, 0, 2, 1])
+    """
+    (_, first_positions, inverse) = np.unique(ids, return_index=True, return_inverse=True)
+    ranks = np.empty(len(first_positions), dtype=int)
+    ranks[np.argsort(first_positions)] = np.arange(len(first_positions))
+    return ranks[inverse.ravel()]
+
+
+def valuation_list_to_valuation_matrix(valuation_list, agent_count:int=None, resource_count:int=None):
     """
     Converts a valuation-list from the Spliddit database to a valuation-matrix for the algorithm.
+    Agents and resources are indexed by order of first appearance in the list.
     :param valuation_list: a list with triplets of the form:
-       (agent_id, resource_id, value)
+       (agent_id, resource_id, value);  or an (n,3) numpy array with the same columns.
+    :param agent_count, resource_count: the matrix dimensions. By default, the number of distinct agents and resources.
     :return:  valuation_matrix: a matrix where in each (row,col) there is the value of agent row to resource col.
 
     >>> valuation_list = [(5778, 5599, 80.0), (5778, 5600, 799.0), (5778, 5601, 121.0), (5779, 5599, 109.0), (5779, 5600, 732.0), (5779, 5601, 159.0)]
     >>> print(valuation_list_to_valuation_matrix(valuation_list, agent_count=2, resource_count=3))
     [[ 80. 799. 121.]
      [109. 732. 159.]]
+    >>> print(valuation_list_to_valuation_matrix(np.array([[7, 2, 1.], [7, 1, 2.], [3, 1, 3.], [3, 2, 4.]])))
+    [[1. 2.]
+     [4. 3.]]
     """
-    current_agent_index = 0
-    map_agentid_to_index = {}
-    current_resource_index = 0
-    map_resourceid_to_index = {}
+    valuation_array = np.asarray(valuation_list).reshape(-1,3)
+    agent_indices = first_appearance_indices(valuation_array[:,0])
+    resource_indices = first_appearance_indices(valuation_array[:,1])
+    if agent_count is None:
+        agent_count = agent_indices.max(initial=-1) + 1
+    if resource_count is None:
+        resource_count = resource_indices.max(initial=-1) + 1
     valuation_matrix = np.zeros((agent_count,resource_count))
-    for (agentid, resourceid, value) in valuation_list:
+    valuation_matrix[agent_indices, resource_indices] = valuation_array[:,2]
+    return valuation_matrix
+
 
-        if agentid in map_agentid_to_index:
-            agent_index = map_agentid_to_index[agentid]
-        else:
-            agent_index = current_agent_index
-            current_agent_index += 1
-            map_agentid_to_index[agentid] = agent_index
 
-        if resourceid in map_resourceid_to_index:
-            resource_index = map_resourceid_to_index[resourceid]
+### Instance cache:
+# All instances are exported once into a single uncompressed .npz file, holding:
+#   values - the valuation matrices of all instances, flattened and concatenated;
+#   index  - one row per instance: (instance_id, application_id, offset into values, num_agents, num_resources);
+#   database_mtime_ns, database_size, database_sha256 - identify the database the cache was built from.
+# The values array is memory-mapped, so a valuation matrix is a zero-copy slice of the file.
+
+INDEX_INSTANCE_ID, INDEX_APPLICATION_ID, INDEX_OFFSET, INDEX_NUM_AGENTS, INDEX_NUM_RESOURCES = range(5)
+
+
+def default_cache_file(database_file:str=None)->str:
+    """
+    >>> default_cache_file("spliddit-2020-07-31-goods-real.db")
+    'spliddit-2020-07-31-goods-real.cache.npz'
+    """
+    database_file = database_file or SPLIDDIT_DATABASE_FILE
+    return os.path.splitext(database_file)[0] + ".cache.npz"
+
+
+def file_sha256(file:str)->str:
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(1<<20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_instance_cache(database_file:str=None, cache_file:str=None):
+    """
+    Export all instances of the database into a single cache file.
+    """
+    database_file = database_file or SPLIDDIT_DATABASE_FILE
+    cache_file = cache_file or default_cache_file(database_file)
+    connection = spliddit_connection(database_file)   # creates the index before the database is fingerprinted.
+    application_ids = [application_id for (application_id,) in query_to_array(connection, "select distinct application_id from instances order by application_id")]
+    connection.close()
+    index_rows = []
+    value_chunks = []
+    offset = 0
+    for application_id in application_ids:
+        for (instance_id, valuation_matrix) in spliddit_instances_from_database(application_id=application_id, database_file=database_file):
+            (num_agents, num_resources) = valuation_matrix.shape
+            index_rows.append((instance_id, application_id, offset, num_agents, num_resources))
+            value_chunks.append(valuation_matrix.ravel())
+            offset += valuation_matrix.size
+    index = np.array(index_rows, dtype=np.int64).reshape(-1,5)
+    order = np.argsort(index[:,INDEX_INSTANCE_ID], kind="stable")
+    database_stat = os.stat(database_file)
+    with open(cache_file, "wb") as f:   # np.savez would append ".npz" to a path with a different extension.
+        np.savez(f,
+            values=np.concatenate(value_chunks) if value_chunks else np.zeros(0),
+            index=index[order],
+            database_mtime_ns=database_stat.st_mtime_ns,
+            database_size=database_stat.st_size,
+            database_sha256=file_sha256(database_file))
+
+
+def memmap_npz_member(npz_file:str, name:str)->np.ndarray:
+    """
+    Memory-map an array stored (uncompressed) inside an .npz file.
+    """
+    with zipfile.ZipFile(npz_file) as archive:
+        info = archive.getinfo(name+".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{name} is compressed in {npz_file}, so it cannot be memory-mapped")
+    with open(npz_file, "rb") as f:
+        f.seek(info.header_offset)
+        local_header = f.read(30)
+        (file_name_length, extra_field_length) = struct.unpack("<HH", local_header[26:30])
+        f.seek(info.header_offset + 30 + file_name_length + extra_field_length)
+        version = np.lib.format.read_magic(f)
+        if version == (1,0):
+            (shape, fortran_order, dtype) = np.lib.format.read_array_header_1_0(f)
         else:
-            resource_index = current_resource_index
-            current_resource_index += 1
-            map_resourceid_to_index[resourceid] = resource_index
+            (shape, fortran_order, dtype) = np.lib.format.read_array_header_2_0(f)
+        data_offset = f.tell()
+    if len(shape)==0 or shape[0]==0:
+        return np.zeros(shape, dtype=dtype)   # np.memmap cannot map an empty array.
+    return np.memmap(npz_file, dtype=dtype, mode="r", shape=shape, offset=data_offset, order="F" if fortran_order else "C")
 
-        valuation_matrix[agent_index,resource_index] = value
 
-    return valuation_matrix
+def is_cache_valid(cache_file:str, database_file:str)->bool:
+    """
+    The cache is valid if the database has the same mtime and size as when the cache was built.
+    If the mtime changed, the database content hash decides; if the content is the same,
+    the new mtime and size are stored in the cache, so that the database is not hashed again next time.
+    """
+    if not os.path.isfile(cache_file):
+        return False
+    if not os.path.isfile(database_file):
+        return True   # the cache is all we have.
+    with np.load(cache_file) as cache:
+        database_stat = os.stat(database_file)
+        if database_stat.st_mtime_ns==cache["database_mtime_ns"] and database_stat.st_size==cache["database_size"]:
+            return True
+        if file_sha256(database_file)!=str(cache["database_sha256"]):
+            return False
+        members = {name: cache[name] for name in cache.files}
+    members.update(database_mtime_ns=database_stat.st_mtime_ns, database_size=database_stat.st_size)
+    with open(cache_file+".tmp", "wb") as f:
+        np.savez(f, **members)
+    os.replace(cache_file+".tmp", cache_file)   # processes that memory-mapped the old cache keep reading it.
+    return True
+
+
+def open_instance_cache(database_file:str=None, cache_file:str=None)->dict:
+    """
+    Open the cache file of the given database, building it first if it is missing or outdated.
+    :return a dict with the memory-mapped "values", the "index" array, and a map from instance_id to its row in the index.
+    """
+    database_file = database_file or SPLIDDIT_DATABASE_FILE
+    cache_file = cache_file or default_cache_file(database_file)
+    if not is_cache_valid(cache_file, database_file):
+        build_instance_cache(database_file, cache_file)
+    with np.load(cache_file) as cache:
+        index = cache["index"]
+    return {
+        "values": memmap_npz_member(cache_file, "values"),
+        "index": index,
+        "rows": {instance_id: row for (row, instance_id) in enumerate(index[:,INDEX_INSTANCE_ID].tolist())},
+    }
+
+
+def instance_cache()->dict:
+    """
+    Return the cache of SPLIDDIT_DATABASE_FILE, opening it on first use.
+    """
+    # the open cache is a static variable: https://stackoverflow.com/a/279597/827927
+    if getattr(instance_cache, "database_file", None) != SPLIDDIT_DATABASE_FILE:
+        instance_cache.cache = open_instance_cache(SPLIDDIT_DATABASE_FILE)
+        instance_cache.database_file = SPLIDDIT_DATABASE_FILE
+    return instance_cache.cache
+
+
+def cached_index_row(cache:dict, instance_id:int)->np.ndarray:
+    if instance_id not in cache["rows"]:
+        raise ValueError("Instance {} not found".format(instance_id))
+    return cache["index"][cache["rows"][instance_id]]
+
+
+def cached_application_id(cache:dict, instance_id:int)->int:
+    return int(cached_index_row(cache, instance_id)[INDEX_APPLICATION_ID])
+
+
+def cached_valuation_matrix(cache:dict, instance_id:int)->np.ndarray:
+    """
+    Return the (read-only) valuation matrix of the given instance, as a view into the cache file.
+    """
+    (_, _, offset, num_agents, num_resources) = cached_index_row(cache, instance_id)
+    return cache["values"][offset : offset+num_agents*num_resources].reshape(num_agents, num_resources)
 
 
 